@@ -0,0 +1,76 @@
+"""
+Compares the cost of the motion stage on idle and busy footage.
+
+"always-mog2" is the old pipeline (MOG2 + threshold + contours on every
+frame), "two-stage" is dashboard.motion.MotionDetector. Frames are
+synthetic small frames (the 0.25x resize the camera feeds the detector).
+
+Usage:
+    python benchmarks/bench_motion_stage.py [--width 480] [--height 270] [--frames 600]
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dashboard.motion import MotionDetector  # noqa: E402
+
+MIN_CONTOUR_AREA = 500
+
+
+def make_scene(width, height, frames, moving):
+    rng = np.random.default_rng(0)
+    background = rng.integers(60, 120, (height, width, 3), dtype=np.uint8)
+    for i in range(frames):
+        # Mild sensor noise on every frame
+        frame = cv2.add(background, rng.integers(0, 4, background.shape, dtype=np.uint8))
+        if moving:
+            x = (i * 4) % max(1, width - 60)
+            frame[height // 3:height // 3 + 90, x:x + 60] = 230
+        yield frame
+
+
+def always_mog2(frames):
+    bg = cv2.createBackgroundSubtractorMOG2(history=500, varThreshold=50, detectShadows=True)
+    for frame in frames:
+        fg = bg.apply(frame)
+        _, thresh = cv2.threshold(fg, 244, 255, cv2.THRESH_BINARY)
+        contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        [c for c in contours if cv2.contourArea(c) > MIN_CONTOUR_AREA]
+
+
+def two_stage(frames):
+    detector = MotionDetector(MIN_CONTOUR_AREA)
+    for count, frame in enumerate(frames, start=1):
+        detector.detect(frame, count)
+    return detector
+
+
+def timed(fn, frames):
+    frames = list(frames)
+    started = time.process_time()
+    result = fn(frames)
+    return (time.process_time() - started) / len(frames) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--width', type=int, default=480)
+    parser.add_argument('--height', type=int, default=270)
+    parser.add_argument('--frames', type=int, default=600)
+    args = parser.parse_args()
+
+    cv2.setNumThreads(1)
+    for label, moving in (("idle", False), ("motion", True)):
+        old_ms, _ = timed(always_mog2, make_scene(args.width, args.height, args.frames, moving))
+        new_ms, detector = timed(two_stage, make_scene(args.width, args.height, args.frames, moving))
+        print(f"{label:<7} always-mog2 {old_ms:6.3f} ms/frame   two-stage {new_ms:6.3f} ms/frame   "
+              f"(full pipeline on {detector.full_count}/{args.frames} frames)")
+
+
+if __name__ == '__main__':
+    main()
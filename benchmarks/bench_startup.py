@@ -0,0 +1,86 @@
+"""
+Cold-start benchmark for the web process and manage.py commands.
+
+Each scenario runs in a fresh interpreter under `python -X importtime`; the
+script reports wall time, total import time, the slowest top-level imports
+and whether any of the camera's heavy dependencies were pulled in.
+
+Usage:
+    python benchmarks/bench_startup.py [--repeat 5] [--top 10]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that should only load on first camera use
+HEAVY_MODULES = ('cv2', 'face_recognition', 'dlib', 'twilio', 'simpleaudio', 'dashboard.camera')
+
+WEB_PROCESS = (
+    "import os; os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'security_project.settings'); "
+    "import security_project.wsgi; import security_project.urls"
+)
+
+SCENARIOS = [
+    ("web process (wsgi + urls)", [sys.executable, '-X', 'importtime', '-c', WEB_PROCESS]),
+    ("manage.py check", [sys.executable, '-X', 'importtime', 'manage.py', 'check']),
+    ("manage.py help", [sys.executable, '-X', 'importtime', 'manage.py', 'help']),
+]
+
+
+def parse_importtime(stderr):
+    """Returns {module: (self_us, cumulative_us, depth)} from -X importtime output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        except ValueError:
+            continue
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return modules
+
+
+def run_scenario(cmd):
+    env = dict(os.environ, CAMERA_WARMUP='False')
+    started = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=PROJECT_ROOT, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(cmd)} failed:\n{proc.stderr[-2000:]}")
+    return wall, parse_importtime(proc.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    for label, cmd in SCENARIOS:
+        walls, imports, modules = [], [], {}
+        for _ in range(args.repeat):
+            wall, modules = run_scenario(cmd)
+            walls.append(wall)
+            imports.append(sum(self_us for self_us, _, _ in modules.values()) / 1e6)
+        print(f"== {label}")
+        print(f"   wall time    median {statistics.median(walls) * 1000:7.1f} ms  (min {min(walls) * 1000:.1f})")
+        print(f"   import time  median {statistics.median(imports) * 1000:7.1f} ms  ({len(modules)} modules)")
+        loaded = [name for name in HEAVY_MODULES if name in modules]
+        print(f"   heavy modules loaded: {', '.join(loaded) if loaded else 'none'}")
+        top_level = sorted(
+            ((cumulative, name) for name, (_, cumulative, depth) in modules.items() if depth == 0),
+            reverse=True,
+        )[:args.top]
+        for cumulative, name in top_level:
+            print(f"   {cumulative / 1000:8.1f} ms  {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Replays footage through the face detector backends and compares speed
+against recall.
+
+Input is a video file, a directory of images, or a camera's recordings
+directory (recordings/<camera_id>/ from the continuous recorder). Frames
+are shrunk to the 0.25x RGB frame the camera feeds the detector. Without
+hand labels, the --reference detector's boxes are treated as ground truth:
+recall is the share of reference faces a detector found (IoU >= --iou),
+"extra" counts boxes the reference didn't have.
+
+Detector specs are backend names or "prefilter+confirm" pairs.
+
+Usage:
+    python benchmarks/compare_detectors.py recordings/cam0 --detectors hog haar lbp dnn haar+hog
+    python benchmarks/compare_detectors.py clip.mp4 --reference dnn --every 5 --max-frames 500
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dashboard import detectors  # noqa: E402
+
+SCALE = 0.25  # Same shrink as VideoCamera._ensure_work_buffers
+
+
+def iter_source(path, every, max_frames):
+    """Yields BGR frames from a video, an image directory or a recordings directory."""
+    count = 0
+
+    def frames():
+        if os.path.isdir(path):
+            from dashboard import recorder
+            root, camera_id = os.path.split(os.path.normpath(path))
+            segments = recorder.list_segments(camera_id, root)
+            if segments:
+                for _, base_path in segments:
+                    with open(base_path + '.mjpg', 'rb') as f:
+                        data = f.read()
+                    for record in recorder.load_index(base_path):
+                        jpeg = data[int(record['offset']):int(record['offset']) + int(record['size'])]
+                        yield cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+            else:
+                for filename in sorted(os.listdir(path)):
+                    if filename.lower().endswith(('.png', '.jpg', '.jpeg')):
+                        yield cv2.imread(os.path.join(path, filename))
+        else:
+            video = cv2.VideoCapture(path)
+            while True:
+                ret, frame = video.read()
+                if not ret:
+                    break
+                yield frame
+            video.release()
+
+    for i, frame in enumerate(frames()):
+        if frame is None or i % every:
+            continue
+        yield frame
+        count += 1
+        if max_frames and count >= max_frames:
+            return
+
+
+def build(spec):
+    if '+' in spec:
+        propose, confirm = spec.split('+', 1)
+        return detectors.PrefilterDetector(detectors.create_backend(propose), detectors.create_backend(confirm))
+    return detectors.create_backend(spec)
+
+
+def match_count(found, reference, min_iou):
+    """Greedy one-to-one matching; returns how many reference boxes were found."""
+    unused = list(found)
+    hits = 0
+    for ref_box in reference:
+        best = max(unused, key=lambda box: detectors.box_iou(box, ref_box), default=None)
+        if best is not None and detectors.box_iou(best, ref_box) >= min_iou:
+            unused.remove(best)
+            hits += 1
+    return hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('source', help="Video file, image directory or recordings/<camera_id> directory.")
+    parser.add_argument('--detectors', nargs='+', default=['hog', 'haar', 'haar+hog'],
+                        help="Backends to compare (hog, haar, lbp, dnn or prefilter+confirm).")
+    parser.add_argument('--reference', default='hog', help="Detector whose boxes count as ground truth.")
+    parser.add_argument('--iou', type=float, default=0.3,
+                        help="Min IoU for a match (backends draw boxes of different tightness).")
+    parser.add_argument('--every', type=int, default=1, help="Use every Nth frame.")
+    parser.add_argument('--max-frames', type=int, default=0, help="Stop after this many frames (0 = all).")
+    args = parser.parse_args()
+
+    reference = build(args.reference)
+    candidates = []
+    for spec in args.detectors:
+        try:
+            candidates.append((spec, build(spec)))
+        except (IOError, ValueError) as e:
+            print(f"Skipping {spec}: {e}")
+
+    print(f"Replaying {args.source} (reference: {args.reference})...")
+    stats = {spec: {'ms': [], 'found': 0, 'hits': 0} for spec, _ in candidates}
+    reference_faces = 0
+    frames = 0
+    rgb_small = None
+    for frame in iter_source(args.source, args.every, args.max_frames):
+        small = cv2.resize(frame, (0, 0), fx=SCALE, fy=SCALE)
+        rgb_small = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+        truth = reference.detect(rgb_small)
+        reference_faces += len(truth)
+        frames += 1
+        for spec, detector in candidates:
+            started = time.perf_counter()
+            boxes = detector.detect(rgb_small)
+            stats[spec]['ms'].append((time.perf_counter() - started) * 1000)
+            stats[spec]['found'] += len(boxes)
+            stats[spec]['hits'] += match_count(boxes, truth, args.iou)
+
+    if not frames:
+        print("No frames read.")
+        return
+    print(f"{frames} frames of {rgb_small.shape[1]}x{rgb_small.shape[0]}, {reference_faces} reference faces\n")
+    print(f"{'detector':<14}{'mean ms':>9}{'p95 ms':>9}{'fps':>8}{'recall':>8}{'extra':>7}")
+    for spec, _ in candidates:
+        ms = sorted(stats[spec]['ms'])
+        mean = statistics.mean(ms)
+        p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+        recall = stats[spec]['hits'] / reference_faces if reference_faces else float('nan')
+        extra = stats[spec]['found'] - stats[spec]['hits']
+        print(f"{spec:<14}{mean:>9.2f}{p95:>9.2f}{1000 / mean:>8.0f}{recall:>8.1%}{extra:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,373 @@
+"""
+HTTP load test for the dashboard endpoints.
+
+Starts the Django app (runserver --noreload) in a throwaway directory with a
+synthetic video source (IP_CAMERA_URL=synthetic://...) and an events table
+seeded with --events rows, then drives it with concurrent clients:
+
+  * MJPEG viewers on /video_feed/ (delivered fps, time to first frame)
+  * pollers on /get_latest_events/ (what every open dashboard does)
+  * status clients toggling /set_status/ARMED|DISARMED/
+
+and reports throughput, latency percentiles and the server's CPU and
+memory. Everything runs locally; no network or camera needed.
+
+Usage:
+    python benchmarks/loadtest.py --viewers 4 --pollers 16 --status-clients 2 --duration 30
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+EVENT_TYPES = ['INTRUDER_DETECTED', 'SYSTEM_ARMED', 'SYSTEM_DISARMED', 'SYSTEM_RESET', 'FACE_ADDED']
+
+
+# --- Server setup ---
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def seed_database(workdir, count, days=30):
+    """Creates security.db in workdir with `count` events spread over `days`."""
+    # Same schema as dashboard.camera.init_db, without loading the CV stack here
+    from dashboard import rollups
+    conn = sqlite3.connect(os.path.join(workdir, 'security.db'))
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            event_type TEXT NOT NULL,
+            details TEXT,
+            image_path TEXT,
+            visitor_id INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS idx_events_image_path ON events (image_path);
+        CREATE TABLE IF NOT EXISTS system_state (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+        INSERT OR IGNORE INTO system_state (key, value) VALUES ('status', 'ARMED');
+    ''')
+    conn.commit()
+    rollups.ensure_rollup_schema(conn)
+    rng = random.Random(0)
+    now = time.time()
+    batch = []
+    for _ in range(count):
+        ts = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(now - rng.random() * days * 86400))
+        batch.append((ts, rng.choice(EVENT_TYPES), "Seeded by loadtest.", None, 'cam0'))
+        if len(batch) >= 10000:
+            conn.executemany("INSERT INTO events (timestamp, event_type, details, image_path, camera_id) "
+                             "VALUES (?, ?, ?, ?, ?)", batch)
+            batch.clear()
+    if batch:
+        conn.executemany("INSERT INTO events (timestamp, event_type, details, image_path, camera_id) "
+                         "VALUES (?, ?, ?, ?, ?)", batch)
+    conn.commit()
+    conn.close()
+
+
+def start_server(workdir, port, source_url):
+    env = dict(
+        os.environ,
+        PYTHONPATH=PROJECT_ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''),
+        DJANGO_SETTINGS_MODULE='security_project.settings',
+        DJANGO_SECRET_KEY='loadtest-only',
+        DJANGO_DEBUG='False',
+        IP_CAMERA_URL=source_url,
+        CAMERA_WARMUP='False',
+        RECORDING_ENABLED='False',
+        # Never page anybody from a load test
+        TWILIO_ACCOUNT_SID='', EMAIL_HOST_USER='',
+    )
+    log = open(os.path.join(workdir, 'server.log'), 'w')
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(PROJECT_ROOT, 'manage.py'), 'runserver', '--noreload', f'127.0.0.1:{port}'],
+        cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Server exited early, see {log.name}")
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/get_latest_events/')
+            if conn.getresponse().status == 200:
+                conn.close()
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("Server did not come up within 60s")
+
+
+# --- Server resource sampling ---
+
+class ResourceSampler(threading.Thread):
+    """Samples the server's CPU% and RSS once a second (psutil, else /proc)."""
+
+    def __init__(self, pid):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.cpu = []
+        self.rss_mb = []
+        self.stop_event = threading.Event()
+
+    def run(self):
+        try:
+            import psutil
+            process = psutil.Process(self.pid)
+            process.cpu_percent()
+            while not self.stop_event.wait(1.0):
+                self.cpu.append(process.cpu_percent())
+                self.rss_mb.append(process.memory_info().rss / 1e6)
+            return
+        except ImportError:
+            pass
+        if not os.path.exists(f'/proc/{self.pid}/stat'):
+            return  # Neither psutil nor /proc (e.g. macOS without psutil)
+        ticks = os.sysconf('SC_CLK_TCK')
+        page_size = os.sysconf('SC_PAGE_SIZE')
+        last_cpu, last_time = self._cpu_seconds(ticks), time.time()
+        while not self.stop_event.wait(1.0):
+            cpu, now = self._cpu_seconds(ticks), time.time()
+            self.cpu.append((cpu - last_cpu) / (now - last_time) * 100)
+            last_cpu, last_time = cpu, now
+            with open(f'/proc/{self.pid}/statm') as f:
+                self.rss_mb.append(int(f.read().split()[1]) * page_size / 1e6)
+
+    def _cpu_seconds(self, ticks):
+        with open(f'/proc/{self.pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / ticks
+
+
+# --- Clients ---
+
+class RequestStats:
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def add(self, latency=None, error=False):
+        with self.lock:
+            if error:
+                self.errors += 1
+            else:
+                self.latencies.append(latency)
+
+
+def request_loop(port, paths, stats, stop_event, interval):
+    """Closed-loop client over one keep-alive connection."""
+    conn = None
+    i = 0
+    while not stop_event.is_set():
+        path = paths[i % len(paths)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            if conn is None:
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 400:
+                raise http.client.HTTPException(f"HTTP {response.status}")
+            stats.add(time.perf_counter() - started)
+        except (OSError, http.client.HTTPException):
+            stats.add(error=True)
+            if conn is not None:
+                conn.close()
+            conn = None
+        if interval:
+            stop_event.wait(interval)
+    if conn is not None:
+        conn.close()
+
+
+def mjpeg_viewer(port, result, stop_event):
+    """Reads /video_feed/ and records when each multipart frame arrives."""
+    started = time.perf_counter()
+    result.update(frames=0, bytes=0, first_frame=None, error=None)
+    try:
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+        conn.request('GET', '/video_feed/')
+        response = conn.getresponse()
+        while not stop_event.is_set():
+            line = response.readline()
+            if not line:
+                break
+            if not line.lower().startswith(b'content-length:'):
+                continue
+            length = int(line.split(b':', 1)[1])
+            response.readline()  # blank line before the JPEG
+            data = response.read(length)
+            if len(data) < length:
+                break
+            if result['first_frame'] is None:
+                result['first_frame'] = time.perf_counter() - started
+                result['measure_from'] = time.perf_counter()
+            result['frames'] += 1
+            result['bytes'] += length
+        conn.close()
+    except (OSError, http.client.HTTPException) as e:
+        result['error'] = str(e)
+    result['measure_until'] = time.perf_counter()
+
+
+# --- Reporting ---
+
+def percentile(values, pct):
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize_requests(name, stats, elapsed):
+    ms = [latency * 1000 for latency in stats.latencies]
+    return {
+        'endpoint': name,
+        'requests': len(ms),
+        'errors': stats.errors,
+        'throughput_rps': len(ms) / elapsed if elapsed else 0,
+        'p50_ms': percentile(ms, 50),
+        'p90_ms': percentile(ms, 90),
+        'p99_ms': percentile(ms, 99),
+        'max_ms': max(ms) if ms else float('nan'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--viewers', type=int, default=4, help="Concurrent MJPEG clients.")
+    parser.add_argument('--pollers', type=int, default=8, help="Concurrent /get_latest_events/ clients.")
+    parser.add_argument('--status-clients', type=int, default=1, help="Concurrent /set_status/ clients.")
+    parser.add_argument('--poll-interval', type=float, default=0.0,
+                        help="Seconds between a poller's requests (0 = as fast as possible; the page uses 5).")
+    parser.add_argument('--duration', type=float, default=30.0, help="Seconds of load after warm-up.")
+    parser.add_argument('--events', type=int, default=100000, help="Rows to seed into the events table.")
+    parser.add_argument('--source', default='synthetic://1280x720@15', help="IP_CAMERA_URL for the server.")
+    parser.add_argument('--json', help="Also write the report to this file.")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='sentineleye-loadtest-')
+    print(f"Working directory: {workdir}")
+    print(f"Seeding {args.events} events...")
+    seed_database(workdir, args.events)
+
+    port = free_port()
+    server = start_server(workdir, port, args.source)
+    sampler = ResourceSampler(server.pid)
+    try:
+        # Start the camera once so model loading isn't counted as latency
+        print("Warming up the camera...")
+        warmup, warm_stop = {}, threading.Event()
+        warm_thread = threading.Thread(target=mjpeg_viewer, args=(port, warmup, warm_stop))
+        warm_thread.start()
+        while warm_thread.is_alive() and warmup.get('frames', 0) < 1:
+            time.sleep(0.1)
+        warm_stop.set()
+        warm_thread.join()
+        if warmup.get('error') or not warmup.get('frames'):
+            raise RuntimeError(f"Camera did not start: {warmup.get('error')}")
+        print(f"First frame after {warmup['first_frame']:.2f}s (includes model loading).")
+
+        stop_event = threading.Event()
+        poll_stats, status_stats = RequestStats(), RequestStats()
+        viewer_results = [{} for _ in range(args.viewers)]
+        threads = [threading.Thread(target=mjpeg_viewer, args=(port, result, stop_event), daemon=True)
+                   for result in viewer_results]
+        threads += [threading.Thread(target=request_loop, daemon=True,
+                                     args=(port, ['/get_latest_events/'], poll_stats, stop_event, args.poll_interval))
+                    for _ in range(args.pollers)]
+        threads += [threading.Thread(target=request_loop, daemon=True,
+                                     args=(port, ['/set_status/ARMED/', '/set_status/DISARMED/'],
+                                           status_stats, stop_event, 0.5))
+                    for _ in range(args.status_clients)]
+
+        print(f"Running {args.viewers} viewers, {args.pollers} pollers, "
+              f"{args.status_clients} status clients for {args.duration:.0f}s...")
+        sampler.start()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(args.duration)
+        stop_event.set()
+        elapsed = time.perf_counter() - started
+        for thread in threads:
+            thread.join(timeout=10)
+        sampler.stop_event.set()
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    fps = []
+    for result in viewer_results:
+        if result.get('frames', 0) > 1:
+            fps.append((result['frames'] - 1) / (result['measure_until'] - result['measure_from']))
+    report = {
+        'config': vars(args),
+        'requests': [summarize_requests('/get_latest_events/', poll_stats, elapsed),
+                     summarize_requests('/set_status/', status_stats, elapsed)],
+        'mjpeg': {
+            'viewers': args.viewers,
+            'viewer_errors': sum(1 for result in viewer_results if result.get('error')),
+            'fps_per_client': [round(value, 2) for value in fps],
+            'fps_min': min(fps) if fps else 0,
+            'fps_median': statistics.median(fps) if fps else 0,
+            'first_frame_s_max': max((result['first_frame'] for result in viewer_results
+                                      if result.get('first_frame') is not None), default=None),
+            'total_mbps': sum(result.get('bytes', 0) for result in viewer_results) * 8 / elapsed / 1e6,
+        },
+        'server': {
+            'cpu_percent_avg': statistics.mean(sampler.cpu) if sampler.cpu else None,
+            'cpu_percent_max': max(sampler.cpu) if sampler.cpu else None,
+            'rss_mb_max': max(sampler.rss_mb) if sampler.rss_mb else None,
+        },
+    }
+
+    print()
+    print(f"{'endpoint':<22}{'req':>8}{'err':>6}{'req/s':>9}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for row in report['requests']:
+        print(f"{row['endpoint']:<22}{row['requests']:>8}{row['errors']:>6}{row['throughput_rps']:>9.1f}"
+              f"{row['p50_ms']:>9.1f}{row['p90_ms']:>9.1f}{row['p99_ms']:>9.1f}{row['max_ms']:>9.1f}")
+    mjpeg = report['mjpeg']
+    print(f"\nMJPEG: {mjpeg['viewers']} viewers, {mjpeg['viewer_errors']} errors, "
+          f"fps min {mjpeg['fps_min']:.1f} / median {mjpeg['fps_median']:.1f}, {mjpeg['total_mbps']:.1f} Mbit/s total")
+    print(f"       per client: {mjpeg['fps_per_client']}")
+    server_stats = report['server']
+    if server_stats['cpu_percent_avg'] is not None:
+        print(f"\nServer: CPU avg {server_stats['cpu_percent_avg']:.0f}% / max {server_stats['cpu_percent_max']:.0f}%, "
+              f"RSS max {server_stats['rss_mb_max']:.0f} MB")
+    else:
+        print("\nServer: CPU/memory unavailable (install psutil)")
+    print(f"Server log: {os.path.join(workdir, 'server.log')}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,31 +1,25 @@
+# NOTE: This module is heavy to import (OpenCV). views.py only imports it
+# on first camera use, so keep anything else expensive (face_recognition's
+# dlib models, Twilio, audio, SMTP) behind function calls too.
 import cv2
-import face_recognition
 import os
 import time
 import numpy as np
-from twilio.rest import Client
-from dotenv import load_dotenv
 from collections import deque
 import sqlite3
 from django.utils import timezone
-import simpleaudio as sa  # Use simpleaudio
 import threading  # We need the full threading library
-import sys
-import smtplib
-import ssl
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.application import MIMEApplication
-
-# --- Configuration and Setup (No changes) ---
-try:
-    if load_dotenv():
-        print("Loaded environment variables from .env file.")
-    else:
-        print("Warning: .env file not found.")
-except Exception as e:
-    print(f"Error loading .env file: {e}")
-
+from .motion import MotionDetector
+from . import media_store
+from . import face_gallery
+from . import recorder
+from . import rollups
+from . import detectors
+from .synthetic_source import SyntheticCapture
+from .visitors import visitor_index, VISITOR_ALERT_COOLDOWN
+
+# --- Configuration and Setup ---
+# .env is loaded once by security_project/settings.py before we get here.
 # (All your .env variables like TWILIO_ACCOUNT_SID, IP_CAMERA_URL, etc.)
 TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID')
 TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN')
@@ -35,55 +29,61 @@ EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 ADMIN_EMAIL = os.getenv('ADMIN_EMAIL')
 IP_CAMERA_URL = os.getenv('IP_CAMERA_URL', '0')
+CAMERA_ID = os.getenv('CAMERA_ID', 'cam0')
 MIN_CONTOUR_AREA = int(os.getenv('MIN_CONTOUR_AREA', 500))
 FACE_REC_FRAME_SKIP = int(os.getenv('FACE_REC_FRAME_SKIP', 5))
 DETECTION_THRESHOLD_FRAMES = int(os.getenv('DETECTION_THRESHOLD_FRAMES', 15))
 PATIENCE_SECONDS = int(os.getenv('PATIENCE_SECONDS', 7))
+MOTION_THUMB_WIDTH = int(os.getenv('MOTION_THUMB_WIDTH', 64))
+MOTION_PIXEL_THRESHOLD = int(os.getenv('MOTION_PIXEL_THRESHOLD', 25))
+MOTION_CHANGED_FRACTION = float(os.getenv('MOTION_CHANGED_FRACTION', 0.01))
+MOTION_HOLD_FRAMES = int(os.getenv('MOTION_HOLD_FRAMES', 30))
+BG_UPDATE_INTERVAL = int(os.getenv('BG_UPDATE_INTERVAL', 15))
+STATUS_POLL_SECONDS = float(os.getenv('STATUS_POLL_SECONDS', 1.0))
 twilio_client = None
-if TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN and TWILIO_PHONE_NUMBER:
-    try:
-        twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-        print("Twilio client initialized successfully.")
-    except Exception as e:
-        print(f"Error initializing Twilio client: {e}")
-else:
-    print("Warning: Twilio credentials not fully set. SMS alerts will be disabled.")
+_twilio_client_checked = False
 last_sms_alert_time = 0
 last_beep_alert_time = 0
 SMS_ALERT_COOLDOWN = 300
 BEEP_ALERT_COOLDOWN = 10
+# Grabbed frames are double-buffered: one buffer is published, the other is being decoded into
+FRAME_BUFFER_COUNT = 2
 
 
-# --- All Helper Functions (No changes) ---
+# --- All Helper Functions ---
 
-def load_known_faces(faces_dir="known_faces"):
-    # (This function is unchanged)
-    known_face_encodings = []
-    known_face_names = []
-    print(f"Loading known faces from {faces_dir}...")
-    if not os.path.isdir(faces_dir):
-        print(f"Error: Directory '{faces_dir}' not found.")
-        return known_face_encodings, known_face_names
-    for filename in os.listdir(faces_dir):
-        if filename.lower().endswith(('.png', '.jpg', '.jpeg')):
-            try:
-                path = os.path.join(faces_dir, filename)
-                name = os.path.splitext(filename)[0]
-                image = face_recognition.load_image_file(path)
-                encodings = face_recognition.face_encodings(image)
-                if encodings:
-                    known_face_encodings.append(encodings[0])
-                    known_face_names.append(name)
-                    print(f"Loaded face for: {name}")
-                else:
-                    print(f"Warning: No faces found in {filename}.")
-            except Exception as e:
-                print(f"Error loading face from {filename}: {e}")
-    if not known_face_names:
-        print("Warning: No known faces loaded.")
+def get_twilio_client():
+    """Creates the Twilio client on first use (twilio.rest is slow to import)."""
+    global twilio_client, _twilio_client_checked
+    if _twilio_client_checked:
+        return twilio_client
+    _twilio_client_checked = True
+    if TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN and TWILIO_PHONE_NUMBER:
+        try:
+            from twilio.rest import Client
+            twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+            print("Twilio client initialized successfully.")
+        except Exception as e:
+            print(f"Error initializing Twilio client: {e}")
     else:
-        print(f"Loaded {len(known_face_names)} known faces.")
-    return known_face_encodings, known_face_names
+        print("Warning: Twilio credentials not fully set. SMS alerts will be disabled.")
+    return twilio_client
+
+def open_video_source(url=IP_CAMERA_URL):
+    """
+    Opens IP_CAMERA_URL: a webcam index ('0', '-1'), an RTSP/HTTP URL, or
+    synthetic://WIDTHxHEIGHT@FPS for generated frames (demos, load tests).
+    """
+    if url.startswith(SyntheticCapture.SCHEME):
+        return SyntheticCapture.from_url(url)
+    video_source = url
+    if url == '0': video_source = 0
+    elif url == '-1': video_source = -1
+    return cv2.VideoCapture(video_source)
+
+def load_known_faces(faces_dir="known_faces"):
+    """Loads the authorized-faces gallery (see face_gallery.py for the layout)."""
+    return face_gallery.FaceGallery.load(faces_dir)
 
 def play_beep_alert():
     # (This function is unchanged, using simpleaudio)
@@ -94,6 +94,7 @@ def play_beep_alert():
         print("Playing beep alert...")
         try:
             if os.path.exists(alert_file_path):
+                import simpleaudio as sa  # Use simpleaudio
                 wave_obj = sa.WaveObject.from_wave_file(alert_file_path)
                 play_obj = wave_obj.play()
                 last_beep_alert_time = current_time
@@ -110,6 +111,7 @@ def send_intruder_alert(name):
     global last_sms_alert_time
     current_time = time.time()
     if (current_time - last_sms_alert_time) > SMS_ALERT_COOLDOWN:
+        twilio_client = get_twilio_client()
         if not twilio_client or not ADMIN_PHONE_NUMBER:
             print("SMS alert not sent (Twilio not configured or no admin number).")
             return
@@ -135,6 +137,11 @@ def send_intruder_email_with_attachment(image_path):
         return
     print(f"Preparing to send email alert with image: {image_path}")
     try:
+        import smtplib
+        import ssl
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
+        from email.mime.application import MIMEApplication
         msg = MIMEMultipart()
         msg['From'] = EMAIL_HOST_USER
         msg['To'] = ADMIN_EMAIL
@@ -167,6 +174,12 @@ def init_db():
                 image_path TEXT
             )
         ''')
+        # Lets the retention job rewrite image paths in bulk
+        c.execute("CREATE INDEX IF NOT EXISTS idx_events_image_path ON events (image_path)")
+        # Older databases predate visitor clustering
+        columns = [row[1] for row in c.execute("PRAGMA table_info(events)")]
+        if 'visitor_id' not in columns:
+            c.execute("ALTER TABLE events ADD COLUMN visitor_id INTEGER")
         c.execute('''
             CREATE TABLE IF NOT EXISTS system_state (
                 key TEXT PRIMARY KEY,
@@ -175,26 +188,38 @@ def init_db():
         ''')
         c.execute("INSERT OR IGNORE INTO system_state (key, value) VALUES ('status', 'ARMED')")
         conn.commit()
+        # Per-camera quarter-hour counts for the analytics endpoint (kept up to date by a trigger)
+        rollups.ensure_rollup_schema(conn)
         conn.close()
         print("Database 'security.db' initialized successfully.")
     except Exception as e:
         print(f"Error initializing database: {e}")
 
-def log_event(event_type, details=None, image_path=None):
-    # (This function is unchanged)
+def log_event(event_type, details=None, image_path=None, visitor_id=None, camera_id=CAMERA_ID):
     try:
         conn = sqlite3.connect('security.db')
         c = conn.cursor()
         timestamp = timezone.now().strftime('%Y-%m-%d %H:%M:%S')
         c.execute('''
-            INSERT INTO events (timestamp, event_type, details, image_path)
-            VALUES (?, ?, ?, ?)
-        ''', (timestamp, event_type, details, image_path))
+            INSERT INTO events (timestamp, event_type, details, image_path, visitor_id, camera_id)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (timestamp, event_type, details, image_path, visitor_id, camera_id))
         conn.commit()
         conn.close()
     except Exception as e:
         print(f"Error logging event to database: {e}")
 
+def get_last_visitor_id():
+    """Highest visitor id stored so far, so ids stay unique across restarts."""
+    try:
+        conn = sqlite3.connect('security.db', timeout=1.0)
+        row = conn.execute("SELECT MAX(visitor_id) FROM events").fetchone()
+        conn.close()
+        return row[0] if row else None
+    except Exception as e:
+        print(f"Error reading last visitor id: {e}")
+        return None
+
 def get_system_status():
     # (This function is unchanged)
     status = "ARMED" 
@@ -231,47 +256,77 @@ def run_all_alerts(name, image_path):
 class VideoCamera:
     def __init__(self):
         print("Initializing VideoCamera (Multi-Threaded)...")
+        self.camera_id = CAMERA_ID
         
         # --- Basic Setup ---
-        self.known_face_encodings, self.known_face_names = load_known_faces()
+        self.gallery_generation = face_gallery.generation()
+        self.gallery = load_known_faces()
+        self.gallery_reloading = False
         init_db()
-        log_event("SYSTEM_STARTUP", "Security system started.")
+        visitor_index.seed_next_id(get_last_visitor_id())
+        log_event("SYSTEM_STARTUP", "Security system started.", camera_id=self.camera_id)
 
         # --- Video Source ---
-        video_source = IP_CAMERA_URL
-        if IP_CAMERA_URL == '0': video_source = 0
-        elif IP_CAMERA_URL == '-1': video_source = -1
-        
-        self.video = cv2.VideoCapture(video_source)
+        self.video = open_video_source()
         if not self.video.isOpened():
             print("Warning: Could not open primary video source. Trying fallback...")
-            self.video = cv2.VideoCapture(1 if video_source == 0 else 0)
+            self.video = cv2.VideoCapture(1 if IP_CAMERA_URL == '0' else 0)
             if not self.video.isOpened():
                 raise IOError("Cannot open video stream or webcam.")
         
         print("Successfully connected to video stream.")
         
         # --- Detection Variables ---
-        self.bg_subtractor = cv2.createBackgroundSubtractorMOG2(history=500, varThreshold=50, detectShadows=True)
+        self.motion_detector = MotionDetector(
+            MIN_CONTOUR_AREA,
+            thumb_width=MOTION_THUMB_WIDTH,
+            pixel_threshold=MOTION_PIXEL_THRESHOLD,
+            changed_fraction=MOTION_CHANGED_FRACTION,
+            hold_frames=MOTION_HOLD_FRAMES,
+            bg_update_interval=BG_UPDATE_INTERVAL,
+        )
+        try:
+            self.face_detector = detectors.create_detector()
+        except (IOError, ValueError) as e:
+            print(f"Warning: {e} Falling back to the HOG face detector.")
+            self.face_detector = detectors.HogDetector()
+        print(f"Face detector: {self.face_detector.name}")
         self.intruder_deque = deque([False] * DETECTION_THRESHOLD_FRAMES, maxlen=DETECTION_THRESHOLD_FRAMES)
         self.intruder_status = False
         self.intruder_last_seen_time = None
         self.frame_count = 0
+        self.current_status = "ARMED"
+        self.status_checked_at = 0
 
         # --- Threading-Specific Variables ---
         
-        # The latest raw frame from the camera
-        (self.grabbed, self.frame) = self.video.read()
+        # Preallocated frame buffers. The grab thread decodes straight into
+        # one of these and then publishes its index, so no per-frame arrays
+        # are allocated on the hot path (see _grab_frames).
+        self.frame_buffers = [None] * FRAME_BUFFER_COUNT
+        self.latest_index = 0
+        self.frame_seq = 0
+        (self.grabbed, self.frame_buffers[0]) = self.video.read()
+        if self.grabbed:
+            self.frame_seq = 1
+        
+        # Reusable destination arrays for the processing thread, allocated
+        # on the first frame (and again only if the resolution changes).
+        self._small_frame = None
+        self._rgb_small_frame = None
         
         # The latest *processed* data (boxes, names, etc.)
         self.last_known_face_locations = []
         self.last_known_face_names = []
+        self.last_unknown_visitor_id = None
         self.motion_contours = []
         self.current_status_text = "ARMED"
         self.patience_text = ""
         
         # A lock to prevent race conditions
         self.lock = threading.Lock()
+        # Signalled by the grab thread whenever a new frame is published
+        self.frame_ready = threading.Condition(self.lock)
         
         # A signal to tell threads to stop
         self.stop_event = threading.Event()
@@ -286,91 +341,167 @@ class VideoCamera:
         self.process_thread = threading.Thread(target=self._process_frames, daemon=True)
         self.process_thread.start()
 
+        # 3. Optional continuous recorder (samples frames on its own thread)
+        self.recorder = None
+        if recorder.RECORDING_ENABLED:
+            self.recorder = recorder.SegmentRecorder(self.camera_id, self.copy_latest_frame)
+            self.recorder.start()
+
         print("VideoCamera initialized successfully.")
 
-    def __del__(self):
+    def stop(self):
+        """Signals the worker threads and the recorder to stop (safe to call twice)."""
         print("Stopping VideoCamera threads...")
         self.stop_event.set()  # Signal threads to stop
+        with self.lock:
+            self.frame_ready.notify_all()  # Wake anyone waiting for a frame
+        if getattr(self, 'recorder', None) is not None:
+            self.recorder.stop()
+            # Let it close its segment before a replacement starts writing
+            if self.recorder.thread is not None:
+                self.recorder.thread.join(timeout=2.0)
+
+    def __del__(self):
+        self.stop()
         if self.video.isOpened():
             self.video.release()
         print("VideoCamera released.")
 
+    def _wait_for_frame(self, last_seq):
+        """
+        Must be called with self.lock held. Blocks until a frame newer than
+        last_seq has been published, returns False if the camera is stopping.
+        """
+        while not self.stop_event.is_set():
+            if self.grabbed and self.frame_seq != last_seq:
+                return True
+            self.frame_ready.wait(timeout=1.0)
+        return False
+
+    def copy_latest_frame(self, dst=None):
+        """
+        Copies the newest frame into dst (allocating only if dst is missing
+        or the resolution changed). Returns (frame_seq, frame).
+        """
+        with self.lock:
+            if not self.grabbed:
+                return 0, dst
+            latest = self.frame_buffers[self.latest_index]
+            if dst is None or dst.shape != latest.shape:
+                dst = np.empty_like(latest)
+            np.copyto(dst, latest)
+            return self.frame_seq, dst
+
+    def _ensure_work_buffers(self, shape):
+        """(Re)allocates the processing thread's reusable arrays for a frame shape."""
+        height, width = shape[:2]
+        small_size = (max(1, int(round(width * 0.25))), max(1, int(round(height * 0.25))))
+        if self._small_frame is not None and self._small_frame.shape[1::-1] == small_size:
+            return
+        small_w, small_h = small_size
+        self._small_frame = np.empty((small_h, small_w, 3), dtype=np.uint8)
+        self._rgb_small_frame = np.empty((small_h, small_w, 3), dtype=np.uint8)
+
+    def _poll_system_status(self):
+        """Reads the ARMED/DISARMED flag at most every STATUS_POLL_SECONDS."""
+        now = time.time()
+        if (now - self.status_checked_at) >= STATUS_POLL_SECONDS:
+            self.current_status = get_system_status()
+            self.status_checked_at = now
+        return self.current_status
+
+    def _reload_gallery_if_changed(self):
+        """Picks up faces added/removed from the dashboard without blocking detection."""
+        if self.gallery_reloading or face_gallery.generation() == self.gallery_generation:
+            return
+        self.gallery_reloading = True
+        self.gallery_generation = face_gallery.generation()
+
+        def reload():
+            try:
+                # Only new or changed images get encoded; swap in one assignment
+                self.gallery = load_known_faces()
+            finally:
+                self.gallery_reloading = False
+
+        threading.Thread(target=reload, daemon=True).start()
+
     def _grab_frames(self):
         """This function runs in a background thread."""
         print("GRAB THREAD: Started...")
+        write_index = 1
         while not self.stop_event.is_set():
-            ret, frame = self.video.read()
+            # Decode into the back buffer. It is never the published one, so
+            # readers holding the lock can't see a half-written frame.
+            ret, frame = self.video.read(self.frame_buffers[write_index])
             if not ret:
                 print("GRAB THREAD: Frame not received. Reconnecting...")
                 self.video.release()
                 time.sleep(2)
                 # Re-initialize
-                video_source = IP_CAMERA_URL
-                if IP_CAMERA_URL == '0': video_source = 0
-                elif IP_CAMERA_URL == '-1': video_source = -1
-                self.video = cv2.VideoCapture(video_source)
+                self.video = open_video_source()
                 if not self.video.isOpened():
                     print("GRAB THREAD: Could not reconnect. Exiting.")
                     break
                 continue
             
-            # Use a lock to safely update the shared frame
+            # Publish the back buffer by swapping indices under the lock.
+            # read() only allocates a new array when the resolution changes.
             with self.lock:
+                self.frame_buffers[write_index] = frame
                 self.grabbed = ret
-                self.frame = frame
+                self.latest_index = write_index
+                self.frame_seq += 1
+                self.frame_ready.notify_all()
+            write_index = (write_index + 1) % FRAME_BUFFER_COUNT
         print("GRAB THREAD: Stopped.")
 
     def _process_frames(self):
         """This function runs in a background thread."""
+        import face_recognition  # Loads the dlib models (see warm_up)
         print("PROCESS THREAD: Started...")
+        last_seq = 0
         while not self.stop_event.is_set():
             try:
-                # Get the latest frame
+                # Wait for a new frame and shrink it straight out of the
+                # shared buffer into our preallocated small frame.
                 with self.lock:
-                    if not self.grabbed or self.frame is None:
-                        continue # Wait for a frame
-                    frame = self.frame.copy()
+                    if not self._wait_for_frame(last_seq):
+                        break
+                    last_seq = self.frame_seq
+                    frame = self.frame_buffers[self.latest_index]
+                    self._ensure_work_buffers(frame.shape)
+                    small_frame = cv2.resize(frame, self._small_frame.shape[1::-1], dst=self._small_frame)
                 
                 # --- This is all your logic from the old loop ---
                 
-                current_status = get_system_status()
-                small_frame = cv2.resize(frame, (0, 0), fx=0.25, fy=0.25)
+                current_status = self._poll_system_status()
+                self._reload_gallery_if_changed()
                 
                 self.frame_count += 1
-                motion_detected_this_frame = False
                 current_frame_has_intruder = False
 
-                fg_mask = self.bg_subtractor.apply(small_frame)
-                _, thresh_mask = cv2.threshold(fg_mask, 244, 255, cv2.THRESH_BINARY)
-                contours, _ = cv2.findContours(thresh_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-                
-                local_motion_contours = []
-                for contour in contours:
-                    if cv2.contourArea(contour) > MIN_CONTOUR_AREA:
-                        motion_detected_this_frame = True
-                        local_motion_contours.append(contour)
+                # Cheap thumbnail check first; MOG2 + contours only run on motion
+                local_motion_contours = self.motion_detector.detect(small_frame, self.frame_count)
+                motion_detected_this_frame = bool(local_motion_contours)
                 
                 local_face_locations = []
                 local_face_names = []
                 
                 if motion_detected_this_frame:
                     if self.frame_count % FACE_REC_FRAME_SKIP == 0:
-                        rgb_small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
-                        local_face_locations = face_recognition.face_locations(rgb_small_frame)
+                        rgb_small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB, dst=self._rgb_small_frame)
+                        local_face_locations = self.face_detector.detect(rgb_small_frame)
                         face_encodings = face_recognition.face_encodings(rgb_small_frame, local_face_locations)
+                        # One centroid distance matrix for every face in the frame
+                        face_names = self.gallery.match_many(face_encodings)
 
-                        for face_encoding in face_encodings:
-                            matches = face_recognition.compare_faces(self.known_face_encodings, face_encoding, tolerance=0.45)
-                            name = "Unknown"
-                            face_distances = face_recognition.face_distance(self.known_face_encodings, face_encoding)
-                            if len(face_distances) > 0:
-                                best_match_index = np.argmin(face_distances)
-                                if matches[best_match_index]:
-                                    name = self.known_face_names[best_match_index]
-                            
+                        for face_encoding, name in zip(face_encodings, face_names):
                             local_face_names.append(name)
                             if name == "Unknown":
                                 current_frame_has_intruder = True
+                                # Cluster unknown faces so repeat visitors keep one id
+                                self.last_unknown_visitor_id = visitor_index.assign(face_encoding)
                     else:
                         # On skipped frames, use the last known results
                         local_face_locations = self.last_known_face_locations
@@ -387,21 +518,31 @@ class VideoCamera:
                     full_image_path = None
                     try:
                         now_dt = timezone.now()
-                        filename = f"intruder_{now_dt.strftime('%Y-%m-%d_%H-%M-%S')}.jpg"
-                        if not os.path.exists("intruders"):
-                            os.makedirs("intruders")
-                        full_image_path = os.path.join("intruders", filename)
-                        cv2.imwrite(full_image_path, frame) # Save the full original frame
-                        print(f"Saved intruder image: {filename}")
+                        # Only copy the full-res frame on the (rare) confirmation
+                        with self.lock:
+                            snapshot = self.frame_buffers[self.latest_index].copy()
+                        # Saves the full original frame plus a thumbnail for the dashboard
+                        full_image_path = media_store.save_capture(snapshot, now_dt)
+                        print(f"Saved intruder image: {full_image_path}")
                     except Exception as e:
                         print(f"Error saving intruder image: {e}")
 
+                    visitor_id = self.last_unknown_visitor_id
+                    visit_count, should_alert = visitor_index.record_event(visitor_id, VISITOR_ALERT_COOLDOWN)
+                    if visitor_id is None:
+                        details = "Unknown person confirmed."
+                    else:
+                        details = f"Unknown visitor #{visitor_id} confirmed (visit {visit_count})."
+
                     # --- Start alerts in a non-blocking thread ---
-                    threading.Thread(
-                        target=run_all_alerts,
-                        args=("Unknown person", full_image_path)
-                    ).start()
-                    log_event("INTRUDER_DETECTED", "Unknown person confirmed.", full_image_path)
+                    if should_alert:
+                        threading.Thread(
+                            target=run_all_alerts,
+                            args=("Unknown person", full_image_path)
+                        ).start()
+                    else:
+                        print(f"Alerts suppressed: visitor #{visitor_id} was already reported recently.")
+                    log_event("INTRUDER_DETECTED", details, full_image_path, visitor_id, self.camera_id)
 
                 elif current_status == "DISARMED":
                     if self.intruder_status:
@@ -416,7 +557,7 @@ class VideoCamera:
                         self.intruder_last_seen_time = time.time()
                     if (time.time() - self.intruder_last_seen_time) >= PATIENCE_SECONDS:
                         print("--- Intruder has left. Resetting status. ---")
-                        log_event("SYSTEM_RESET", "Intruder no longer seen.")
+                        log_event("SYSTEM_RESET", "Intruder no longer seen.", camera_id=self.camera_id)
                         self.intruder_status = False
                         self.intruder_last_seen_time = None
                         self.intruder_deque.clear()
@@ -455,12 +596,20 @@ class VideoCamera:
         This is the generator function that Django streams.
         It's now very fast and lightweight.
         """
+        # Each client draws on its own canvas, allocated once and reused
+        canvas = None
+        last_seq = 0
         while not self.stop_event.is_set():
             with self.lock:
-                if not self.grabbed or self.frame is None:
-                    continue
-                # Make a copy to draw on
-                frame = self.frame.copy()
+                if not self._wait_for_frame(last_seq):
+                    break
+                last_seq = self.frame_seq
+                latest = self.frame_buffers[self.latest_index]
+                if canvas is None or canvas.shape != latest.shape:
+                    canvas = np.empty_like(latest)
+                # Copy into the canvas to draw on
+                np.copyto(canvas, latest)
+            frame = canvas
             
             # --- Draw the *last known* results ---
             # This is super fast, no "thinking"
@@ -503,4 +652,38 @@ class VideoCamera:
                 b'Content-Type: image/jpeg\r\n'
                 b'Content-Length: ' + f"{len(frame_data)}".encode() + b'\r\n'
                 b'\r\n' + frame_data + b'\r\n'
-            )
\ No newline at end of file
+            )
+
+# ---
+# --- Shared camera + warm-up ---
+# ---
+
+_camera = None
+_camera_lock = threading.Lock()
+
+def get_camera():
+    """
+    Returns the process-wide VideoCamera, starting it on first use.
+    Every MJPEG client streams from the same capture and worker threads.
+    """
+    global _camera
+    with _camera_lock:
+        # Restart if the grab thread gave up after a failed reconnect
+        if _camera is None or not _camera.grab_thread.is_alive():
+            if _camera is not None:
+                # Don't leave its process thread and recorder running
+                _camera.stop()
+            _camera = VideoCamera()
+        return _camera
+
+def warm_up():
+    """
+    Production hook (CAMERA_WARMUP=True, see security_project/wsgi.py).
+    Loads the dlib models (face_recognition reads them on import), the
+    Twilio client and the database so the first viewer doesn't pay for them.
+    """
+    started = time.perf_counter()
+    import face_recognition  # noqa: F401
+    init_db()
+    get_twilio_client()
+    print(f"Camera dependencies warmed up in {time.perf_counter() - started:.2f}s.")
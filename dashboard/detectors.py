@@ -0,0 +1,200 @@
+"""
+Face detector backends for the recognition stage.
+
+Every detector takes an RGB image and returns boxes as (top, right,
+bottom, left) tuples, the format face_recognition.face_encodings expects.
+
+    hog   dlib HOG via face_recognition (the accurate default)
+    haar  OpenCV Haar cascade (ships with opencv-python 4.x)
+    lbp   OpenCV LBP cascade (faster than Haar, needs FACE_LBP_CASCADE)
+    dnn   OpenCV DNN face model on CPU: the ResNet-10 SSD (.caffemodel +
+          .prototxt) or YuNet (.onnx, via cv2.FaceDetectorYN)
+
+OpenCV 5 removed both the cascade classifier and the Caffe importer from
+opencv-python, which is why requirements.txt pins it below 5. YuNet also
+runs on OpenCV 5.
+
+With FACE_DETECTOR_PREFILTER set, the cheap detector proposes regions and
+only those (padded) crops are passed to FACE_DETECTOR for confirmation, so
+the expensive detector never scans frames without a face candidate.
+"""
+import os
+
+import cv2
+import numpy as np
+
+FACE_DETECTOR = os.getenv('FACE_DETECTOR', 'hog')
+FACE_DETECTOR_PREFILTER = os.getenv('FACE_DETECTOR_PREFILTER', '')
+FACE_HOG_UPSAMPLE = int(os.getenv('FACE_HOG_UPSAMPLE', 1))
+FACE_HAAR_CASCADE = os.getenv(
+    'FACE_HAAR_CASCADE', os.path.join(getattr(getattr(cv2, 'data', None), 'haarcascades', ''),
+                                      'haarcascade_frontalface_default.xml'))
+FACE_LBP_CASCADE = os.getenv('FACE_LBP_CASCADE', 'models/lbpcascade_frontalface_improved.xml')
+FACE_DNN_PROTOTXT = os.getenv('FACE_DNN_PROTOTXT', 'models/deploy.prototxt')
+FACE_DNN_MODEL = os.getenv('FACE_DNN_MODEL', 'models/res10_300x300_ssd_iter_140000.caffemodel')
+FACE_DNN_CONFIDENCE = float(os.getenv('FACE_DNN_CONFIDENCE', 0.5))
+# Proposed boxes are grown by this fraction on each side before confirming
+FACE_PREFILTER_PADDING = float(os.getenv('FACE_PREFILTER_PADDING', 0.5))
+
+
+def _clip_box(top, right, bottom, left, height, width):
+    return max(0, top), min(width, right), min(height, bottom), max(0, left)
+
+
+class HogDetector:
+    name = 'hog'
+
+    def __init__(self, upsample=FACE_HOG_UPSAMPLE):
+        import face_recognition
+        self._face_locations = face_recognition.face_locations
+        self.upsample = upsample
+
+    def detect(self, rgb_image):
+        return self._face_locations(rgb_image, number_of_times_to_upsample=self.upsample, model='hog')
+
+
+class CascadeClassifierDetector:
+    """OpenCV Haar or LBP cascade; works on a grayscale copy of the image."""
+
+    def __init__(self, name, cascade_path, scale_factor=1.1, min_neighbors=5, min_size=(20, 20)):
+        self.name = name
+        if not hasattr(cv2, 'CascadeClassifier'):
+            raise IOError(f"The {name} detector needs OpenCV 4.x (this is {cv2.__version__}, "
+                          f"which has no CascadeClassifier).")
+        self.classifier = cv2.CascadeClassifier(cascade_path)
+        if self.classifier.empty():
+            raise IOError(f"Could not load {name} cascade from '{cascade_path}'.")
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = min_size
+        self._gray = None
+
+    def detect(self, rgb_image):
+        if self._gray is not None and self._gray.shape != rgb_image.shape[:2]:
+            self._gray = None
+        self._gray = cv2.cvtColor(rgb_image, cv2.COLOR_RGB2GRAY, dst=self._gray)
+        faces = self.classifier.detectMultiScale(
+            self._gray, scaleFactor=self.scale_factor, minNeighbors=self.min_neighbors, minSize=self.min_size)
+        return [(int(y), int(x + w), int(y + h), int(x)) for (x, y, w, h) in faces]
+
+
+class DnnDetector:
+    """OpenCV's ResNet-10 SSD face detector (Caffe), run on the CPU."""
+    name = 'dnn'
+
+    def __init__(self, prototxt=FACE_DNN_PROTOTXT, model=FACE_DNN_MODEL, confidence=FACE_DNN_CONFIDENCE):
+        if not (os.path.exists(prototxt) and os.path.exists(model)):
+            raise IOError(f"DNN face model not found ('{prototxt}', '{model}').")
+        if not hasattr(cv2.dnn, 'readNetFromCaffe'):
+            raise IOError(f"The SSD face model needs OpenCV 4.x (this is {cv2.__version__}, which has no "
+                          f"Caffe importer); use the YuNet .onnx model instead.")
+        self.net = cv2.dnn.readNetFromCaffe(prototxt, model)
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        self.confidence = confidence
+
+    def detect(self, rgb_image):
+        height, width = rgb_image.shape[:2]
+        # The model was trained on BGR input, hence swapRB
+        blob = cv2.dnn.blobFromImage(rgb_image, 1.0, (300, 300), (104.0, 177.0, 123.0), swapRB=True)
+        self.net.setInput(blob)
+        detections = self.net.forward()[0, 0]
+        boxes = []
+        for detection in detections[detections[:, 2] >= self.confidence]:
+            left, top, right, bottom = (detection[3:7] * (width, height, width, height)).astype(int)
+            top, right, bottom, left = _clip_box(top, right, bottom, left, height, width)
+            if bottom > top and right > left:
+                boxes.append((int(top), int(right), int(bottom), int(left)))
+        return boxes
+
+
+class YunetDetector:
+    """OpenCV's YuNet face detector (ONNX) through cv2.FaceDetectorYN, on the CPU."""
+    name = 'dnn'
+
+    def __init__(self, model=FACE_DNN_MODEL, confidence=FACE_DNN_CONFIDENCE):
+        if not os.path.exists(model):
+            raise IOError(f"DNN face model not found ('{model}').")
+        try:
+            self.detector = cv2.FaceDetectorYN.create(model, '', (320, 320), confidence)
+        except cv2.error as e:
+            raise IOError(f"Could not load YuNet face model '{model}': {e}")
+        self._input_size = (320, 320)
+        self._bgr = None
+
+    def detect(self, rgb_image):
+        height, width = rgb_image.shape[:2]
+        if self._input_size != (width, height):
+            self.detector.setInputSize((width, height))
+            self._input_size = (width, height)
+        if self._bgr is not None and self._bgr.shape != rgb_image.shape:
+            self._bgr = None
+        self._bgr = cv2.cvtColor(rgb_image, cv2.COLOR_RGB2BGR, dst=self._bgr)
+        _, faces = self.detector.detect(self._bgr)
+        boxes = []
+        for face in faces if faces is not None else []:
+            left, top, w, h = (int(round(v)) for v in face[:4])
+            top, right, bottom, left = _clip_box(top, left + w, top + h, left, height, width)
+            if bottom > top and right > left:
+                boxes.append((top, right, bottom, left))
+        return boxes
+
+
+class PrefilterDetector:
+    """Runs `confirm` only inside the padded regions proposed by `propose`."""
+
+    def __init__(self, propose, confirm, padding=FACE_PREFILTER_PADDING):
+        self.name = f"{propose.name}+{confirm.name}"
+        self.propose = propose
+        self.confirm = confirm
+        self.padding = padding
+
+    def detect(self, rgb_image):
+        height, width = rgb_image.shape[:2]
+        boxes = []
+        for top, right, bottom, left in self.propose.detect(rgb_image):
+            pad_y = int((bottom - top) * self.padding)
+            pad_x = int((right - left) * self.padding)
+            y0, x1, y1, x0 = _clip_box(top - pad_y, right + pad_x, bottom + pad_y, left - pad_x, height, width)
+            # dlib wants a contiguous image, not a strided view
+            crop = np.ascontiguousarray(rgb_image[y0:y1, x0:x1])
+            for c_top, c_right, c_bottom, c_left in self.confirm.detect(crop):
+                box = (c_top + y0, c_right + x0, c_bottom + y0, c_left + x0)
+                # Overlapping proposals can confirm the same face twice
+                if not any(box_iou(box, kept) > 0.5 for kept in boxes):
+                    boxes.append(box)
+        return boxes
+
+
+def box_iou(a, b):
+    """Intersection over union of two (top, right, bottom, left) boxes."""
+    top, right = max(a[0], b[0]), min(a[1], b[1])
+    bottom, left = min(a[2], b[2]), max(a[3], b[3])
+    intersection = max(0, bottom - top) * max(0, right - left)
+    if intersection == 0:
+        return 0.0
+    area_a = (a[2] - a[0]) * (a[1] - a[3])
+    area_b = (b[2] - b[0]) * (b[1] - b[3])
+    return intersection / float(area_a + area_b - intersection)
+
+
+def create_backend(name):
+    if name == 'hog':
+        return HogDetector()
+    if name == 'haar':
+        return CascadeClassifierDetector('haar', FACE_HAAR_CASCADE)
+    if name == 'lbp':
+        return CascadeClassifierDetector('lbp', FACE_LBP_CASCADE)
+    if name == 'dnn':
+        if FACE_DNN_MODEL.lower().endswith('.onnx'):
+            return YunetDetector(FACE_DNN_MODEL)
+        return DnnDetector(FACE_DNN_PROTOTXT, FACE_DNN_MODEL)
+    raise ValueError(f"Unknown face detector '{name}' (expected hog, haar, lbp or dnn).")
+
+
+def create_detector(name=FACE_DETECTOR, prefilter=FACE_DETECTOR_PREFILTER):
+    """Builds the configured detector, optionally behind a cheap pre-filter."""
+    detector = create_backend(name)
+    if prefilter:
+        detector = PrefilterDetector(create_backend(prefilter), detector)
+    return detector
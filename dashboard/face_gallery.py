@@ -0,0 +1,132 @@
+"""
+Gallery of authorized faces with several reference images per person.
+
+Layout:
+    known_faces/<name>/<anything>.jpg   (one directory per identity)
+    known_faces/<name>.jpg              (older single-image layout, still read)
+
+Each identity keeps its individual sample encodings plus their centroid.
+Matching compares against the centroids first and only looks at the
+individual samples of the closest few identities when the centroid
+distance is borderline, so the cost doesn't grow with samples per person.
+"""
+import os
+import threading
+
+import numpy as np
+
+from . import face_manifest
+from .face_manifest import FACES_DIR, iter_gallery_images
+FACE_MATCH_TOLERANCE = float(os.getenv('FACE_MATCH_TOLERANCE', 0.45))
+# Centroid distances within +/- this of the tolerance are checked per sample
+FACE_CENTROID_MARGIN = float(os.getenv('FACE_CENTROID_MARGIN', 0.08))
+FACE_REFINE_TOP_K = int(os.getenv('FACE_REFINE_TOP_K', 3))
+
+# Bumped by the views on upload/delete so running cameras know to reload
+_generation = 0
+# path -> (mtime, encoding or None), so reloads only encode new/changed files
+_encoding_cache = {}
+_cache_lock = threading.Lock()
+
+
+def mark_changed():
+    global _generation
+    _generation += 1
+
+
+def generation():
+    return _generation
+
+
+def _encode_image(path):
+    """Returns the first face encoding in the image (cached by mtime), or None."""
+    import face_recognition
+    mtime = os.path.getmtime(path)
+    with _cache_lock:
+        cached = _encoding_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    image = face_recognition.load_image_file(path)
+    encodings = face_recognition.face_encodings(image)
+    encoding = encodings[0] if encodings else None
+    with _cache_lock:
+        _encoding_cache[path] = (mtime, encoding)
+    return encoding
+
+
+class FaceGallery:
+    def __init__(self, names, samples_by_name):
+        self.names = list(names)
+        self.centroids = np.zeros((len(self.names), 128), dtype=np.float64)
+        sample_list = []
+        # Samples are stored grouped by identity: offsets[i]:offsets[i + 1]
+        self.offsets = np.zeros(len(self.names) + 1, dtype=np.int64)
+        for i, name in enumerate(self.names):
+            samples = samples_by_name[name]
+            self.centroids[i] = np.mean(samples, axis=0)
+            sample_list.extend(samples)
+            self.offsets[i + 1] = self.offsets[i] + len(samples)
+        self.samples = np.array(sample_list, dtype=np.float64).reshape(-1, 128)
+
+    @classmethod
+    def load(cls, faces_dir=FACES_DIR):
+        print(f"Loading known faces from {faces_dir}...")
+        if not os.path.isdir(faces_dir):
+            print(f"Error: Directory '{faces_dir}' not found.")
+            return cls([], {})
+        samples_by_name = {}
+        statuses = {}
+        for name, path in iter_gallery_images(faces_dir):
+            try:
+                encoding = _encode_image(path)
+                if encoding is not None:
+                    samples_by_name.setdefault(name, []).append(encoding)
+                    statuses[path] = face_manifest.STATUS_ENCODED
+                else:
+                    print(f"Warning: No faces found in {path}.")
+                    statuses[path] = face_manifest.STATUS_NO_FACE
+            except Exception as e:
+                print(f"Error loading face from {path}: {e}")
+                statuses[path] = face_manifest.STATUS_ERROR
+        # Lets the dashboard show which uploads are actually usable
+        face_manifest.record_encoding_status(statuses, faces_dir)
+        gallery = cls(sorted(samples_by_name), samples_by_name)
+        if not gallery.names:
+            print("Warning: No known faces loaded.")
+        else:
+            print(f"Loaded {len(gallery.samples)} images of {len(gallery.names)} known people.")
+        return gallery
+
+    def __len__(self):
+        return len(self.names)
+
+    def match(self, encoding, tolerance=FACE_MATCH_TOLERANCE):
+        """Returns the matching person's name, or "Unknown"."""
+        return self.match_many([encoding], tolerance)[0]
+
+    def match_many(self, encodings, tolerance=FACE_MATCH_TOLERANCE):
+        """Matches a batch of encodings with one centroid distance matrix."""
+        encodings = np.asarray(encodings, dtype=np.float64).reshape(-1, 128)
+        if not self.names:
+            return ["Unknown"] * len(encodings)
+        distances = np.linalg.norm(encodings[:, None, :] - self.centroids[None, :, :], axis=2)
+        return [self._decide(row, encoding, tolerance) for row, encoding in zip(distances, encodings)]
+
+    def _decide(self, distances, encoding, tolerance):
+        best = int(np.argmin(distances))
+        if distances[best] <= tolerance - FACE_CENTROID_MARGIN:
+            return self.names[best]
+        if distances[best] > tolerance + FACE_CENTROID_MARGIN:
+            return "Unknown"
+
+        # Borderline: check the individual samples of the closest identities
+        candidates = np.argsort(distances)[:FACE_REFINE_TOP_K]
+        best_name, best_distance = "Unknown", tolerance
+        for i in candidates:
+            if distances[i] > tolerance + FACE_CENTROID_MARGIN:
+                break
+            samples = self.samples[self.offsets[i]:self.offsets[i + 1]]
+            sample_distance = np.linalg.norm(samples - encoding, axis=1).min()
+            if sample_distance <= best_distance:
+                best_name, best_distance = self.names[i], sample_distance
+        return best_name
@@ -0,0 +1,217 @@
+"""
+Enrollment manifest for known_faces/, kept in security.db.
+
+One row per reference image (file relative to known_faces, person name,
+thumbnail path, encoding status, mtime). The upload/delete views update it
+as they change the directory and the gallery loader records whether each
+image produced an encoding, so the dashboard pages through the manifest
+instead of listing a directory with thousands of files.
+
+The table is filled from a stat-only directory scan the first time it is
+needed; `manage.py rebuild_face_manifest` rescans after files were changed
+by hand. Thumbnails are written lazily by the face_thumbnail view the first
+time one is requested (or all at once by rebuild_face_manifest).
+
+Like the views, this module stays free of numpy/OpenCV at import time;
+OpenCV is only loaded to write thumbnails.
+"""
+import os
+import sqlite3
+
+FACES_DIR = 'known_faces'
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+MANIFEST_DB = 'security.db'
+THUMBS_DIR = os.path.join(FACES_DIR, '.thumbs')
+FACE_THUMBNAIL_SIZE = int(os.getenv('FACE_THUMBNAIL_SIZE', 96))
+FACE_THUMBNAIL_QUALITY = int(os.getenv('FACE_THUMBNAIL_QUALITY', 80))
+
+STATUS_PENDING = 'pending'    # Not encoded by the camera yet
+STATUS_ENCODED = 'encoded'
+STATUS_NO_FACE = 'no_face'
+STATUS_ERROR = 'error'
+
+COLUMNS = ('file', 'name', 'thumb_path', 'encoding_status', 'mtime')
+
+
+def iter_gallery_images(faces_dir=FACES_DIR):
+    """Yields (name, path) for every reference image, in a stable order."""
+    if not os.path.isdir(faces_dir):
+        return
+    for entry in sorted(os.listdir(faces_dir)):
+        if entry.startswith('.'):
+            continue  # e.g. .thumbs
+        path = os.path.join(faces_dir, entry)
+        if os.path.isdir(path):
+            for filename in sorted(os.listdir(path)):
+                if filename.lower().endswith(IMAGE_EXTENSIONS):
+                    yield entry, os.path.join(path, filename)
+        elif entry.lower().endswith(IMAGE_EXTENSIONS):
+            yield os.path.splitext(entry)[0], path
+
+
+def relative_file(path, faces_dir=FACES_DIR):
+    return os.path.relpath(path, faces_dir).replace(os.sep, '/')
+
+
+def thumbnail_path_for(file):
+    """'alice/2024.png' -> known_faces/.thumbs/alice/2024.png.jpg"""
+    return os.path.join(THUMBS_DIR, file + '.jpg')
+
+
+def write_thumbnail(image_path, thumb_path, size=FACE_THUMBNAIL_SIZE):
+    """Center-crops the image to a square thumbnail. Returns False if it can't be read."""
+    import cv2
+    image = cv2.imread(image_path)
+    if image is None:
+        return False
+    height, width = image.shape[:2]
+    side = min(height, width)
+    top, left = (height - side) // 2, (width - side) // 2
+    square = image[top:top + side, left:left + side]
+    if side > size:
+        square = cv2.resize(square, (size, size), interpolation=cv2.INTER_AREA)
+    os.makedirs(os.path.dirname(thumb_path), exist_ok=True)
+    return cv2.imwrite(thumb_path, square, [cv2.IMWRITE_JPEG_QUALITY, FACE_THUMBNAIL_QUALITY])
+
+
+def ensure_thumbnail(file, faces_dir=FACES_DIR):
+    """
+    Returns the thumbnail path for a manifest file, writing it first if it
+    is missing or older than the image. Returns None if the image is gone
+    or can't be decoded.
+    """
+    image_path = os.path.join(faces_dir, file)
+    thumb_path = thumbnail_path_for(file)
+    try:
+        mtime = os.path.getmtime(image_path)
+    except OSError:
+        return None
+    if os.path.exists(thumb_path) and os.path.getmtime(thumb_path) >= mtime:
+        return thumb_path
+    try:
+        return thumb_path if write_thumbnail(image_path, thumb_path) else None
+    except Exception as e:
+        print(f"Error writing face thumbnail for {image_path}: {e}")
+        return None
+
+
+def _entry_values(name, path, faces_dir=FACES_DIR, status=STATUS_PENDING):
+    file = relative_file(path, faces_dir)
+    return file, name, thumbnail_path_for(file), status, os.path.getmtime(path)
+
+
+def _table_exists(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'known_faces'"
+    ).fetchone() is not None
+
+
+def _create_table(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS known_faces (
+            file TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            thumb_path TEXT,
+            encoding_status TEXT NOT NULL,
+            mtime REAL NOT NULL
+        )
+    ''')
+
+
+def ensure_manifest(conn, faces_dir=FACES_DIR):
+    """Creates the manifest table, filling it from a directory scan the first time."""
+    if _table_exists(conn):
+        return
+    # Whoever gets the write lock first scans; everyone else then finds the table
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if not _table_exists(conn):
+            _create_table(conn)
+            conn.executemany(f"INSERT INTO known_faces ({', '.join(COLUMNS)}) VALUES (?, ?, ?, ?, ?)",
+                             [_entry_values(name, path, faces_dir) for name, path in iter_gallery_images(faces_dir)])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def rebuild(conn, faces_dir=FACES_DIR, write_thumbnails=False):
+    """Rescans faces_dir into the manifest, keeping known encoding statuses. Returns the row count."""
+    # Scan before taking the write lock
+    scanned = [_entry_values(name, path, faces_dir) for name, path in iter_gallery_images(faces_dir)]
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        _create_table(conn)
+        previous = dict(conn.execute("SELECT file, encoding_status FROM known_faces").fetchall())
+        rows = [(file, name, thumb_path, previous.get(file, status), mtime)
+                for file, name, thumb_path, status, mtime in scanned]
+        conn.execute("DELETE FROM known_faces")
+        conn.executemany(f"INSERT INTO known_faces ({', '.join(COLUMNS)}) VALUES (?, ?, ?, ?, ?)", rows)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    if write_thumbnails:
+        for file, *_ in rows:
+            ensure_thumbnail(file, faces_dir)
+    return len(rows)
+
+
+def add_entry(conn, name, path, faces_dir=FACES_DIR):
+    """Records a newly saved reference image; its thumbnail is written on first request."""
+    ensure_manifest(conn, faces_dir)
+    conn.execute(f"INSERT OR REPLACE INTO known_faces ({', '.join(COLUMNS)}) VALUES (?, ?, ?, ?, ?)",
+                 _entry_values(name, path, faces_dir))
+    conn.commit()
+
+
+def remove_entry(conn, file, faces_dir=FACES_DIR):
+    ensure_manifest(conn, faces_dir)
+    row = conn.execute("SELECT thumb_path FROM known_faces WHERE file = ?", (file,)).fetchone()
+    conn.execute("DELETE FROM known_faces WHERE file = ?", (file,))
+    conn.commit()
+    if row and row[0]:
+        try:
+            os.remove(row[0])
+            thumb_dir = os.path.dirname(row[0])
+            if os.path.normpath(thumb_dir) != os.path.normpath(THUMBS_DIR) and not os.listdir(thumb_dir):
+                os.rmdir(thumb_dir)
+        except OSError:
+            pass
+
+
+def get_entry(conn, file):
+    row = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM known_faces WHERE file = ?", (file,)).fetchone()
+    return dict(zip(COLUMNS, row)) if row else None
+
+
+def list_entries(conn, after=None, limit=50):
+    """
+    One page of entries ordered by file (so grouped by person). Returns
+    (entries, next_cursor); pass next_cursor back as `after` for the next
+    page. Keyset paging keeps every page an index range scan.
+    """
+    rows = conn.execute(
+        f"SELECT {', '.join(COLUMNS)} FROM known_faces WHERE file > ? ORDER BY file LIMIT ?",
+        (after or '', limit + 1)
+    ).fetchall()
+    entries = [dict(zip(COLUMNS, row)) for row in rows[:limit]]
+    next_cursor = entries[-1]['file'] if len(rows) > limit else None
+    return entries, next_cursor
+
+
+def record_encoding_status(statuses, faces_dir=FACES_DIR, db_path=MANIFEST_DB):
+    """Called by the gallery loader with {image path: status}."""
+    if not statuses:
+        return
+    try:
+        conn = sqlite3.connect(db_path, timeout=5.0)
+        ensure_manifest(conn, faces_dir)
+        conn.executemany(
+            "UPDATE known_faces SET encoding_status = ? WHERE file = ? AND encoding_status != ?",
+            [(status, relative_file(path, faces_dir), status) for path, status in statuses.items()],
+        )
+        conn.commit()
+        conn.close()
+    except Exception as e:
+        print(f"Error updating face manifest: {e}")
@@ -0,0 +1,29 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand
+
+from dashboard import rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Counts events logged before the rollups existed (or were last rebuilt). Works in committed "
+        "id ranges, so it can be stopped and re-run at any time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000, help="Events per transaction (default 10000).")
+
+    def handle(self, *args, **options):
+        conn = sqlite3.connect('security.db', timeout=5.0)
+        try:
+            rollups.ensure_rollup_schema(conn)
+            done = None
+            for done, upto in rollups.backfill(conn, options['batch_size']):
+                self.stdout.write(f"Backfilled events up to id {done} of {upto}")
+        finally:
+            conn.close()
+        if done is None:
+            self.stdout.write("Rollups are already up to date.")
+        else:
+            self.stdout.write(self.style.SUCCESS("Backfill complete."))
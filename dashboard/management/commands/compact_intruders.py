@@ -0,0 +1,69 @@
+import os
+import sqlite3
+
+from django.core.management.base import BaseCommand
+
+from dashboard import media_store
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompresses or deletes old intruder originals (keeping their thumbnails) "
+        "and repoints events.image_path in one transaction before removing anything."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-age-days', type=float, default=float(os.getenv('INTRUDER_RETENTION_DAYS', 30)),
+            help="Originals older than this are compacted (0 disables). Default: INTRUDER_RETENTION_DAYS or 30.",
+        )
+        parser.add_argument(
+            '--max-disk-mb', type=float, default=float(os.getenv('INTRUDER_DISK_BUDGET_MB', 0)),
+            help="Compact the oldest originals until they fit in this budget (0 disables). "
+                 "Default: INTRUDER_DISK_BUDGET_MB or 0.",
+        )
+        parser.add_argument(
+            '--recompress', action='store_true',
+            help="Re-encode originals at --quality first instead of deleting them straight away.",
+        )
+        parser.add_argument(
+            '--quality', type=int, default=int(os.getenv('INTRUDER_RECOMPRESS_QUALITY', 50)),
+            help="JPEG quality for --recompress. Default: INTRUDER_RECOMPRESS_QUALITY or 50.",
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would change.")
+
+    def handle(self, *args, **options):
+        changes, freed = media_store.compact_originals(
+            max_age_seconds=options['max_age_days'] * 86400,
+            max_bytes=int(options['max_disk_mb'] * 1024 * 1024),
+            recompress=options['recompress'],
+            quality=options['quality'],
+            dry_run=options['dry_run'],
+        )
+        if not changes:
+            self.stdout.write("Nothing to compact.")
+            return
+        if options['dry_run']:
+            for old_path, new_path in changes:
+                self.stdout.write(f"{old_path} -> {new_path}")
+            self.stdout.write(f"Would compact {len(changes)} originals.")
+            return
+
+        # Replacements are on disk; repoint the events before deleting anything
+        conn = sqlite3.connect('security.db', timeout=5.0)
+        try:
+            with conn:
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_events_image_path ON events (image_path)")
+                conn.executemany(
+                    "UPDATE events SET image_path = ? WHERE image_path = ?",
+                    [(new_path, old_path) for old_path, new_path in changes],
+                )
+        except Exception:
+            media_store.discard_replacements(changes)
+            raise
+        finally:
+            conn.close()
+        media_store.remove_replaced(changes)
+        self.stdout.write(self.style.SUCCESS(
+            f"Compacted {len(changes)} originals, freed {freed / (1024 * 1024):.1f} MB."
+        ))
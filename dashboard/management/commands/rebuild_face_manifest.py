@@ -0,0 +1,20 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand
+
+from dashboard import face_manifest
+
+
+class Command(BaseCommand):
+    help = (
+        "Rescans known_faces/ into the enrollment manifest and writes missing thumbnails. "
+        "Only needed after adding or removing images outside the dashboard."
+    )
+
+    def handle(self, *args, **options):
+        conn = sqlite3.connect('security.db', timeout=5.0)
+        try:
+            count = face_manifest.rebuild(conn, write_thumbnails=True)
+        finally:
+            conn.close()
+        self.stdout.write(self.style.SUCCESS(f"Face manifest rebuilt: {count} images."))
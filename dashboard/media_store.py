@@ -0,0 +1,190 @@
+"""
+Storage for intruder captures.
+
+Captures are fanned out into date-partitioned directories
+(intruders/YYYY/MM/DD/) and every original gets a small JPEG thumbnail next
+to it (<name>_thumb.jpg). The dashboard only ever loads thumbnails; the
+retention job (manage.py compact_intruders) recompresses or deletes old
+originals, leaving the thumbnail behind.
+
+OpenCV is imported inside the functions that need it so the web views can
+use the path helpers without loading it.
+"""
+import os
+
+INTRUDERS_DIR = 'intruders'
+THUMB_SUFFIX = '_thumb'
+RECOMPRESSED_SUFFIX = '_lq'
+THUMBNAIL_WIDTH = int(os.getenv('THUMBNAIL_WIDTH', 320))
+THUMBNAIL_QUALITY = int(os.getenv('THUMBNAIL_QUALITY', 70))
+
+
+def _base_stem(path):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    for suffix in (THUMB_SUFFIX, RECOMPRESSED_SUFFIX):
+        if stem.endswith(suffix):
+            return stem[:-len(suffix)]
+    return stem
+
+
+def is_thumbnail(path):
+    return os.path.splitext(os.path.basename(path))[0].endswith(THUMB_SUFFIX)
+
+
+def thumbnail_path_for(image_path):
+    """intruders/.../intruder_X.jpg (or intruder_X_lq.jpg) -> intruders/.../intruder_X_thumb.jpg"""
+    if is_thumbnail(image_path):
+        return image_path
+    return os.path.join(os.path.dirname(image_path), f"{_base_stem(image_path)}{THUMB_SUFFIX}.jpg")
+
+
+def media_key(image_path):
+    """The path relative to INTRUDERS_DIR, as used in URLs."""
+    return os.path.relpath(image_path, INTRUDERS_DIR).replace(os.sep, '/')
+
+
+def resolve_media_key(key):
+    """Maps a URL key back to a file under INTRUDERS_DIR, or None if it escapes it."""
+    root = os.path.normpath(INTRUDERS_DIR)
+    filepath = os.path.normpath(os.path.join(root, key))
+    if not filepath.startswith(root + os.sep):
+        return None
+    return filepath
+
+
+def write_thumbnail(image, thumb_path):
+    import cv2
+    height, width = image.shape[:2]
+    if width > THUMBNAIL_WIDTH:
+        size = (THUMBNAIL_WIDTH, max(1, int(round(height * THUMBNAIL_WIDTH / width))))
+        image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+    return cv2.imwrite(thumb_path, image, [cv2.IMWRITE_JPEG_QUALITY, THUMBNAIL_QUALITY])
+
+
+def save_capture(frame, now_dt, prefix='intruder'):
+    """
+    Writes the full-resolution frame and its thumbnail into today's
+    directory and returns the original's path (what goes in events.image_path).
+    """
+    import cv2
+    directory = os.path.join(INTRUDERS_DIR, now_dt.strftime('%Y'), now_dt.strftime('%m'), now_dt.strftime('%d'))
+    os.makedirs(directory, exist_ok=True)
+    filename = f"{prefix}_{now_dt.strftime('%Y-%m-%d_%H-%M-%S')}.jpg"
+    image_path = os.path.join(directory, filename)
+    cv2.imwrite(image_path, frame)
+    write_thumbnail(frame, thumbnail_path_for(image_path))
+    return image_path
+
+
+def iter_originals():
+    """Yields (path, size, mtime) for every original capture under INTRUDERS_DIR."""
+    for dirpath, _, filenames in os.walk(INTRUDERS_DIR):
+        for filename in filenames:
+            if not filename.lower().endswith(('.jpg', '.jpeg')) or is_thumbnail(filename):
+                continue
+            path = os.path.join(dirpath, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            yield path, stat.st_size, stat.st_mtime
+
+
+def compact_originals(max_age_seconds=0, max_bytes=0, recompress=False, quality=50, now=None, dry_run=False):
+    """
+    Shrinks the originals, oldest first, that are older than max_age_seconds
+    or needed to get the originals under max_bytes (0 disables either rule).
+
+    With recompress=True an original is first re-encoded at `quality` as
+    <name>_lq.jpg; already recompressed files (and everything in delete
+    mode) are replaced by the thumbnail. Returns (changes, freed_bytes)
+    where changes is a list of (old_path, new_path) for events.image_path.
+
+    Only the replacements are written here. The old files stay until the
+    caller has committed the path rewrite and calls remove_replaced(), so
+    events never point at a deleted file.
+    """
+    import time
+    now = now or time.time()
+    originals = sorted(iter_originals(), key=lambda item: item[2])
+    total_bytes = sum(size for _, size, _ in originals)
+
+    changes = []
+    freed = 0
+    for path, size, mtime in originals:
+        too_old = max_age_seconds and (now - mtime) > max_age_seconds
+        over_budget = max_bytes and (total_bytes - freed) > max_bytes
+        if not (too_old or over_budget):
+            # Sorted by age, so nothing newer qualifies either
+            break
+        already_recompressed = _base_stem(path) != os.path.splitext(os.path.basename(path))[0]
+        if recompress and not already_recompressed:
+            new_path = os.path.join(os.path.dirname(path), f"{_base_stem(path)}{RECOMPRESSED_SUFFIX}.jpg")
+            # A dry run still encodes (in memory) so the budget sees the real savings
+            new_size = _recompress(path, new_path, quality, dry_run)
+            if new_size is None:
+                continue
+            freed += size - new_size
+            changes.append((path, new_path))
+        else:
+            new_path = thumbnail_path_for(path)
+            if not dry_run and not _ensure_thumbnail(path, new_path):
+                continue
+            freed += size
+            changes.append((path, new_path))
+    return changes, freed
+
+
+def _recompress(path, new_path, quality, dry_run=False):
+    """Re-encodes path at quality into new_path and returns its size (dry_run: size only)."""
+    import cv2
+    image = cv2.imread(path)
+    if image is None:
+        print(f"Warning: could not read {path}, skipping.")
+        return None
+    ret, jpeg = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ret:
+        print(f"Warning: could not encode {path}, skipping.")
+        return None
+    if dry_run:
+        return jpeg.nbytes
+    if not os.path.exists(thumbnail_path_for(path)):
+        write_thumbnail(image, thumbnail_path_for(path))
+    try:
+        with open(new_path, 'wb') as f:
+            f.write(jpeg.tobytes())
+    except OSError as e:
+        print(f"Warning: could not write {new_path}: {e}, skipping.")
+        return None
+    return jpeg.nbytes
+
+
+def remove_replaced(changes):
+    """Deletes the old files once events.image_path points at their replacements."""
+    for old_path, _ in changes:
+        try:
+            os.remove(old_path)
+        except OSError as e:
+            print(f"Warning: could not remove {old_path}: {e}")
+
+
+def discard_replacements(changes):
+    """Undoes compact_originals when the path rewrite failed: drops the new _lq copies."""
+    for _, new_path in changes:
+        if not is_thumbnail(new_path):
+            try:
+                os.remove(new_path)
+            except OSError:
+                pass
+
+
+def _ensure_thumbnail(path, thumb_path):
+    """Older captures predate thumbnails; make one before the original goes."""
+    if os.path.exists(thumb_path):
+        return True
+    import cv2
+    image = cv2.imread(path)
+    if image is None:
+        print(f"Warning: could not read {path}, skipping.")
+        return False
+    return write_thumbnail(image, thumb_path)
@@ -0,0 +1,96 @@
+import cv2
+import numpy as np
+
+
+class MotionDetector:
+    """
+    Two-stage motion detector.
+
+    Stage 1 is a cheap frame difference on a tiny grayscale thumbnail. Only
+    when enough thumbnail pixels change does stage 2 (MOG2 + contours) run,
+    and it keeps running until MOG2 has reported no motion for `hold_frames`
+    frames. While the scene is idle the background model is only fed every
+    `bg_update_interval` frames to keep it current.
+    """
+
+    def __init__(self, min_contour_area, thumb_width=64, pixel_threshold=25,
+                 changed_fraction=0.01, hold_frames=30, bg_update_interval=15):
+        self.min_contour_area = min_contour_area
+        self.thumb_width = thumb_width
+        self.pixel_threshold = pixel_threshold
+        self.changed_fraction = changed_fraction
+        self.hold_frames = hold_frames
+        self.bg_update_interval = max(1, bg_update_interval)
+
+        self.bg_subtractor = cv2.createBackgroundSubtractorMOG2(history=500, varThreshold=50, detectShadows=True)
+        self.hold_remaining = 0
+        self.idle_count = 0
+        self.full_count = 0
+
+        # Reusable arrays, allocated for the first frame shape seen
+        self._shape = None
+        self._thumb_size = None
+        self._thumb = None
+        self._gray = None
+        self._prev_gray = None
+        self._diff = None
+        self._fg_mask = None
+        self._thresh_mask = None
+
+    def _ensure_buffers(self, shape):
+        if shape == self._shape:
+            return
+        height, width = shape[:2]
+        thumb_w = min(self.thumb_width, width)
+        thumb_h = max(1, int(round(height * thumb_w / width)))
+        self._shape = shape
+        self._thumb_size = (thumb_w, thumb_h)
+        self._thumb = np.empty((thumb_h, thumb_w, 3), dtype=np.uint8)
+        self._gray = np.empty((thumb_h, thumb_w), dtype=np.uint8)
+        self._prev_gray = None
+        self._diff = np.empty((thumb_h, thumb_w), dtype=np.uint8)
+        self._fg_mask = np.empty((height, width), dtype=np.uint8)
+        self._thresh_mask = np.empty((height, width), dtype=np.uint8)
+
+    def _scene_changed(self, frame):
+        """Stage 1: True if the thumbnail differs enough from the previous one."""
+        cv2.resize(frame, self._thumb_size, dst=self._thumb, interpolation=cv2.INTER_LINEAR)
+        cv2.cvtColor(self._thumb, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        if self._prev_gray is None:
+            self._prev_gray = self._gray.copy()
+            return True
+        cv2.absdiff(self._gray, self._prev_gray, dst=self._diff)
+        cv2.threshold(self._diff, self.pixel_threshold, 255, cv2.THRESH_BINARY, dst=self._diff)
+        changed = cv2.countNonZero(self._diff)
+        # Swap so the current thumbnail becomes the reference for next time
+        self._gray, self._prev_gray = self._prev_gray, self._gray
+        return changed > self.changed_fraction * self._diff.size
+
+    def detect(self, frame, frame_count):
+        """
+        Returns the motion contours larger than min_contour_area, or an empty
+        list when the scene is idle (in which case MOG2 is mostly skipped).
+        """
+        self._ensure_buffers(frame.shape)
+
+        if self._scene_changed(frame):
+            self.hold_remaining = self.hold_frames
+        elif self.hold_remaining > 0:
+            self.hold_remaining -= 1
+
+        if self.hold_remaining <= 0:
+            self.idle_count += 1
+            if frame_count % self.bg_update_interval == 0:
+                self.bg_subtractor.apply(frame, fgmask=self._fg_mask)
+            return []
+
+        self.full_count += 1
+        fg_mask = self.bg_subtractor.apply(frame, fgmask=self._fg_mask)
+        _, thresh_mask = cv2.threshold(fg_mask, 244, 255, cv2.THRESH_BINARY, dst=self._thresh_mask)
+        contours, _ = cv2.findContours(thresh_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        motion_contours = [contour for contour in contours if cv2.contourArea(contour) > self.min_contour_area]
+        if motion_contours:
+            # Someone standing still won't trip the frame difference, so stay
+            # in stage 2 for as long as MOG2 still sees foreground.
+            self.hold_remaining = self.hold_frames
+        return motion_contours
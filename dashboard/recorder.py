@@ -0,0 +1,212 @@
+"""
+Optional continuous recording, split into fixed-length segments.
+
+Each segment is a plain MJPEG stream (concatenated JPEG frames, playable
+with ffmpeg/VLC) plus a compact index of fixed-size records
+(timestamp, byte offset, size) that is read back through np.memmap. Seeking
+to a wall-clock time is a directory listing, a bisect over segment start
+times and a searchsorted over one index - the frame's JPEG bytes are then
+read straight from its offset without decoding anything.
+
+Layout:
+    recordings/<camera_id>/<start_ms>.mjpg
+    recordings/<camera_id>/<start_ms>.idx
+
+Old segments are evicted oldest-first once the camera's directory exceeds
+RECORDING_MAX_MB.
+"""
+import bisect
+import os
+import threading
+import time
+
+import numpy as np
+
+RECORDING_ENABLED = os.getenv('RECORDING_ENABLED', 'False') == 'True'
+RECORDING_DIR = os.getenv('RECORDING_DIR', 'recordings')
+RECORDING_SEGMENT_SECONDS = int(os.getenv('RECORDING_SEGMENT_SECONDS', 60))
+RECORDING_FPS = float(os.getenv('RECORDING_FPS', 10))
+RECORDING_MAX_MB = int(os.getenv('RECORDING_MAX_MB', 2048))
+RECORDING_JPEG_QUALITY = int(os.getenv('RECORDING_JPEG_QUALITY', 80))
+
+INDEX_DTYPE = np.dtype([('ts', '<f8'), ('offset', '<u8'), ('size', '<u4')])
+# A lookup further than this past the nearest recorded frame is a gap
+MAX_SEEK_GAP_SECONDS = 5.0
+
+
+def camera_dir(camera_id, root=RECORDING_DIR):
+    return os.path.join(root, camera_id)
+
+
+def list_segments(camera_id, root=RECORDING_DIR):
+    """Returns [(start_ts, base_path)] sorted by start time."""
+    directory = camera_dir(camera_id, root)
+    if not os.path.isdir(directory):
+        return []
+    segments = []
+    for filename in os.listdir(directory):
+        stem, extension = os.path.splitext(filename)
+        if extension == '.idx' and stem.isdigit():
+            segments.append((int(stem) / 1000.0, os.path.join(directory, stem)))
+    segments.sort()
+    return segments
+
+
+def load_index(base_path):
+    """Memory-maps a segment's index (empty array if nothing was written yet)."""
+    idx_path = base_path + '.idx'
+    try:
+        count = os.path.getsize(idx_path) // INDEX_DTYPE.itemsize
+    except OSError:
+        count = 0
+    if count == 0:
+        return np.zeros(0, dtype=INDEX_DTYPE)
+    return np.memmap(idx_path, dtype=INDEX_DTYPE, mode='r', shape=(count,))
+
+
+def find_frame(camera_id, ts, root=RECORDING_DIR):
+    """
+    Returns (frame_ts, jpeg_bytes) for the last frame recorded at or before
+    ts, or None if nothing was recorded around that time.
+    """
+    segments = list_segments(camera_id, root)
+    starts = [start for start, _ in segments]
+    position = bisect.bisect_right(starts, ts) - 1
+    # The frame may be the tail of the previous segment
+    for start, base_path in reversed(segments[max(0, position - 1):position + 1]):
+        index = load_index(base_path)
+        i = int(np.searchsorted(index['ts'], ts, side='right')) - 1
+        if i < 0:
+            continue
+        record = index[i]
+        if ts - record['ts'] > MAX_SEEK_GAP_SECONDS:
+            return None
+        with open(base_path + '.mjpg', 'rb') as f:
+            f.seek(int(record['offset']))
+            return float(record['ts']), f.read(int(record['size']))
+    return None
+
+
+class SegmentRecorder:
+    """
+    Background thread that samples a camera at `fps`, JPEG-encodes each
+    frame and appends it to the current segment.
+
+    read_frame(dst) must copy the camera's latest frame into dst (or a new
+    array if the shape changed) and return (seq, frame).
+    """
+
+    def __init__(self, camera_id, read_frame, root=RECORDING_DIR, segment_seconds=RECORDING_SEGMENT_SECONDS,
+                 fps=RECORDING_FPS, max_bytes=RECORDING_MAX_MB * 1024 * 1024, quality=RECORDING_JPEG_QUALITY):
+        self.camera_id = camera_id
+        self.read_frame = read_frame
+        self.root = root
+        self.segment_seconds = segment_seconds
+        self.interval = 1.0 / fps
+        self.max_bytes = max_bytes
+        self.quality = quality
+        self.stop_event = threading.Event()
+        self.thread = None
+
+        self._data_file = None
+        self._index_file = None
+        self._segment_start = 0
+        self._offset = 0
+        self._record = np.zeros(1, dtype=INDEX_DTYPE)
+
+    def start(self):
+        os.makedirs(camera_dir(self.camera_id, self.root), exist_ok=True)
+        self.evict()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _run(self):
+        import cv2
+        print(f"RECORDER THREAD ({self.camera_id}): Started...")
+        encode_params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        buffer = None
+        last_seq = 0
+        next_tick = time.time()
+        try:
+            while not self.stop_event.is_set():
+                now = time.time()
+                if now < next_tick:
+                    self.stop_event.wait(next_tick - now)
+                    continue
+                next_tick += self.interval
+                if next_tick < now:
+                    # We fell behind (slow encode/disk); don't try to catch up
+                    next_tick = now + self.interval
+
+                seq, buffer = self.read_frame(buffer)
+                if seq == last_seq:
+                    continue  # Camera hasn't produced anything new
+                last_seq = seq
+                ret, jpeg = cv2.imencode('.jpg', buffer, encode_params)
+                if not ret:
+                    continue
+                self._write_frame(now, jpeg)
+        except Exception as e:
+            print(f"RECORDER THREAD ({self.camera_id}): Error: {e}")
+        finally:
+            self._close_segment()
+        print(f"RECORDER THREAD ({self.camera_id}): Stopped.")
+
+    def _write_frame(self, ts, jpeg):
+        if self._data_file is None or ts - self._segment_start >= self.segment_seconds:
+            self._close_segment()
+            self.evict()
+            self._open_segment(ts)
+        self._data_file.write(jpeg)
+        self._data_file.flush()
+        self._record['ts'] = ts
+        self._record['offset'] = self._offset
+        self._record['size'] = jpeg.nbytes
+        # The index is only appended after the frame is on disk, so a
+        # reader never finds an offset that points past the data.
+        self._index_file.write(self._record.tobytes())
+        self._index_file.flush()
+        self._offset += jpeg.nbytes
+
+    def _open_segment(self, ts):
+        base_path = os.path.join(camera_dir(self.camera_id, self.root), f"{int(ts * 1000):013d}")
+        self._data_file = open(base_path + '.mjpg', 'wb')
+        self._index_file = open(base_path + '.idx', 'wb')
+        self._segment_start = ts
+        self._offset = 0
+
+    def _close_segment(self):
+        for f in (self._data_file, self._index_file):
+            if f is not None:
+                f.close()
+        self._data_file = None
+        self._index_file = None
+
+    def evict(self):
+        """Deletes the oldest closed segments until the camera fits in max_bytes."""
+        segments = []
+        total = 0
+        for start, base_path in list_segments(self.camera_id, self.root):
+            size = 0
+            for extension in ('.mjpg', '.idx'):
+                try:
+                    size += os.path.getsize(base_path + extension)
+                except OSError:
+                    pass
+            segments.append((base_path, size))
+            total += size
+        for base_path, size in segments:
+            if total <= self.max_bytes:
+                break
+            if self._data_file is not None and self._data_file.name == base_path + '.mjpg':
+                break  # Never evict the segment being written
+            for extension in ('.idx', '.mjpg'):
+                try:
+                    os.remove(base_path + extension)
+                except OSError:
+                    pass
+            total -= size
+            print(f"Evicted recording segment {base_path}")
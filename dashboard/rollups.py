@@ -0,0 +1,179 @@
+"""
+Event rollups in security.db.
+
+event_rollup holds one row per (quarter hour, event_type, camera) with a
+count. A trigger on events keeps it current for every writer (camera and
+web), so charts are answered from O(buckets) rows instead of scanning
+events. Events that existed before the trigger was installed are counted
+by `manage.py backfill_rollups`, which works through them in id ranges
+and can be interrupted and resumed.
+
+Buckets use the same UTC 'YYYY-MM-DD HH:MM:SS' format as events.timestamp.
+Every UTC offset in use is a multiple of 15 minutes, so query_series can
+regroup quarter hours into the dashboard's local hours and days exactly
+(Asia/Kolkata is +5:30), DST included, which whole UTC hours can't.
+"""
+import datetime
+
+ROLLUP_TABLE = 'event_rollup'
+ROLLUP_TRIGGER = 'events_rollup_quarter_hour'
+# Whole-UTC-hour rollups from before the switch; replaced and recounted
+LEGACY_TABLE = 'event_rollup_hourly'
+LEGACY_TRIGGER = 'events_rollup_hourly'
+SYSTEM_CAMERA = 'system'  # camera_id for events logged from the web dashboard
+
+BUCKET_FORMAT = '%Y-%m-%d %H:%M:%S'
+# Local label of a bucket per granularity (strftime)
+GRANULARITIES = {
+    'hour': '%Y-%m-%d %H:00:00',
+    'day': '%Y-%m-%d',
+    # Busiest hours: all days folded onto 00..23
+    'hour_of_day': '%H',
+}
+
+
+def _bucket_sql(column):
+    """SQL for the quarter hour a 'YYYY-MM-DD HH:MM:SS' timestamp falls in."""
+    minute = f"substr({column}, 15, 2)"
+    return (f"substr({column}, 1, 14) || CASE WHEN {minute} < '15' THEN '00' WHEN {minute} < '30' THEN '15' "
+            f"WHEN {minute} < '45' THEN '30' ELSE '45' END || ':00'")
+
+
+def _ensure_column(conn, column, column_type):
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(events)")]
+    if column not in columns:
+        conn.execute(f"ALTER TABLE events ADD COLUMN {column} {column_type}")
+
+
+def ensure_rollup_schema(conn):
+    """
+    Creates the rollup tables and trigger if needed. The first time, the
+    current MAX(events.id) is recorded in the same transaction as the
+    trigger, so backfill and trigger never count the same event. Hourly
+    rollups from older versions are dropped here and recounted by backfill.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        _ensure_column(conn, 'camera_id', 'TEXT')
+        conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+                bucket TEXT NOT NULL,
+                event_type TEXT NOT NULL,
+                camera_id TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (bucket, event_type, camera_id)
+            ) WITHOUT ROWID
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS rollup_state (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        ''')
+        trigger_exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?", (ROLLUP_TRIGGER,)
+        ).fetchone()
+        if not trigger_exists:
+            conn.execute(f"DROP TRIGGER IF EXISTS {LEGACY_TRIGGER}")
+            conn.execute(f"DROP TABLE IF EXISTS {LEGACY_TABLE}")
+            max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+            conn.execute("INSERT OR REPLACE INTO rollup_state (key, value) VALUES ('backfill_upto', ?)", (max_id,))
+            conn.execute("INSERT OR REPLACE INTO rollup_state (key, value) VALUES ('backfilled_id', 0)")
+            conn.execute(f'''
+                CREATE TRIGGER {ROLLUP_TRIGGER} AFTER INSERT ON events
+                BEGIN
+                    INSERT INTO {ROLLUP_TABLE} (bucket, event_type, camera_id, count)
+                    VALUES ({_bucket_sql('NEW.timestamp')}, NEW.event_type,
+                            COALESCE(NEW.camera_id, '{SYSTEM_CAMERA}'), 1)
+                    ON CONFLICT (bucket, event_type, camera_id) DO UPDATE SET count = count + 1;
+                END
+            ''')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def backfill(conn, batch_size=10000):
+    """
+    Counts pre-trigger events into the rollups, one committed id range at
+    a time. Yields (done_upto_id, backfill_upto_id) after each batch.
+    """
+    state = dict(conn.execute("SELECT key, value FROM rollup_state").fetchall())
+    start = state.get('backfilled_id', 0)
+    upto = state.get('backfill_upto', 0)
+    while start < upto:
+        end = min(start + batch_size, upto)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(f'''
+                INSERT INTO {ROLLUP_TABLE} (bucket, event_type, camera_id, count)
+                SELECT {_bucket_sql('timestamp')}, event_type,
+                       COALESCE(camera_id, '{SYSTEM_CAMERA}'), COUNT(*)
+                FROM events
+                WHERE id > ? AND id <= ?
+                GROUP BY 1, 2, 3
+                ON CONFLICT (bucket, event_type, camera_id) DO UPDATE SET count = count + excluded.count
+            ''', (start, end))
+            conn.execute("UPDATE rollup_state SET value = ? WHERE key = 'backfilled_id'", (end,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        start = end
+        yield start, upto
+
+
+def _offset_spans(since, until, tz):
+    """
+    Splits the UTC window [since, until) into (start, end, utc_offset)
+    spans over which tz keeps one offset (one span unless DST changes).
+    """
+    spans = []
+    start, offset = since, since.astimezone(tz).utcoffset()
+    day = since
+    while day < until:
+        next_day = min(day + datetime.timedelta(days=1), until)
+        if next_day.astimezone(tz).utcoffset() != offset:
+            # Transitions fall on a quarter hour like every offset does
+            moment = day
+            while moment.astimezone(tz).utcoffset() == offset:
+                moment += datetime.timedelta(minutes=15)
+            spans.append((start, moment, offset))
+            start, offset = moment, moment.astimezone(tz).utcoffset()
+        day = next_day
+    spans.append((start, until, offset))
+    return spans
+
+
+def query_series(conn, since, until, granularity='hour', event_type=None, camera_id=None, tz=datetime.timezone.utc):
+    """
+    Returns {event_type: [(label, count), ...]} for buckets in [since, until),
+    both given as UTC 'YYYY-MM-DD HH:MM:SS' strings. Labels are local to tz.
+    """
+    since_utc = datetime.datetime.fromisoformat(since).replace(tzinfo=datetime.timezone.utc)
+    until_utc = datetime.datetime.fromisoformat(until).replace(tzinfo=datetime.timezone.utc)
+    filters = ""
+    filter_params = []
+    if event_type:
+        filters += " AND event_type = ?"
+        filter_params.append(event_type)
+    if camera_id:
+        filters += " AND camera_id = ?"
+        filter_params.append(camera_id)
+
+    counts = {}
+    # SQLite groups each span with a fixed offset, so only labels come back
+    for start, end, offset in _offset_spans(since_utc, until_utc, tz):
+        sql = f'''
+            SELECT strftime(?, bucket, ?) AS label, event_type, SUM(count)
+            FROM {ROLLUP_TABLE}
+            WHERE bucket >= ? AND bucket < ?{filters}
+            GROUP BY label, event_type
+        '''
+        params = [GRANULARITIES[granularity], f"{int(offset.total_seconds() // 60):+d} minutes",
+                  start.strftime(BUCKET_FORMAT), end.strftime(BUCKET_FORMAT)] + filter_params
+        for label, row_event_type, count in conn.execute(sql, params):
+            per_type = counts.setdefault(row_event_type, {})
+            per_type[label] = per_type.get(label, 0) + count
+    return {row_event_type: sorted(per_label.items()) for row_event_type, per_label in counts.items()}
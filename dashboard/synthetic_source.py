@@ -0,0 +1,76 @@
+import time
+
+import cv2
+import numpy as np
+
+
+class SyntheticCapture:
+    """
+    Stand-in for cv2.VideoCapture that generates frames at a fixed rate,
+    selected with IP_CAMERA_URL=synthetic://1280x720@15.
+
+    The scene is a static gradient with a block that walks across it for
+    the first half of every 10 second cycle and stands still for the
+    other half, so both the idle and the motion paths get exercised.
+    """
+
+    SCHEME = 'synthetic://'
+    CYCLE_SECONDS = 10
+
+    def __init__(self, width=1280, height=720, fps=15):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self._opened = True
+        self._frame_no = 0
+        self._next_frame_at = time.monotonic()
+        gradient = np.linspace(40, 200, width, dtype=np.uint8)
+        self._background = np.ascontiguousarray(np.broadcast_to(gradient[None, :, None], (height, width, 3)))
+
+    @classmethod
+    def from_url(cls, url):
+        """Parses synthetic://WIDTHxHEIGHT@FPS (every part optional)."""
+        spec = url[len(cls.SCHEME):]
+        size, _, fps = spec.partition('@')
+        width, _, height = size.partition('x')
+        return cls(int(width or 1280), int(height or 720), float(fps or 15))
+
+    def isOpened(self):
+        return self._opened
+
+    def release(self):
+        self._opened = False
+
+    def get(self, prop_id):
+        if prop_id == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        if prop_id == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop_id == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        return 0.0
+
+    def read(self, image=None):
+        if not self._opened:
+            return False, image
+        # Pace like a real camera
+        delay = self._next_frame_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self._next_frame_at = max(self._next_frame_at + 1.0 / self.fps, time.monotonic() - 1.0)
+
+        if image is None or image.shape != self._background.shape:
+            image = np.empty_like(self._background)
+        np.copyto(image, self._background)
+
+        cycle_frames = int(self.CYCLE_SECONDS * self.fps)
+        phase = self._frame_no % cycle_frames
+        walking_frames = max(1, cycle_frames // 2)
+        block_w, block_h = self.width // 8, self.height // 3
+        x = int(min(phase, walking_frames) / walking_frames * (self.width - block_w))
+        y = self.height // 3
+        cv2.rectangle(image, (x, y), (x + block_w, y + block_h), (30, 30, 220), cv2.FILLED)
+        cv2.putText(image, f"SYNTHETIC {self._frame_no}", (10, self.height - 20),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+        self._frame_no += 1
+        return True, image
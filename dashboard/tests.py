@@ -1,3 +1,320 @@
-from django.test import TestCase
+import os
+import shutil
+import sqlite3
+import tempfile
+import zoneinfo
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.test import SimpleTestCase
+
+from . import face_gallery, face_manifest, recorder, rollups
+from .visitors import VisitorIndex
+
+
+class RollupBackfillTests(SimpleTestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.execute('''
+            CREATE TABLE events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                event_type TEXT NOT NULL,
+                details TEXT
+            )
+        ''')
+
+    def tearDown(self):
+        self.conn.close()
+
+    def insert(self, timestamp, event_type, camera_id=None):
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(events)")]
+        if 'camera_id' in columns:
+            self.conn.execute("INSERT INTO events (timestamp, event_type, camera_id) VALUES (?, ?, ?)",
+                              (timestamp, event_type, camera_id))
+        else:
+            self.conn.execute("INSERT INTO events (timestamp, event_type) VALUES (?, ?)", (timestamp, event_type))
+        self.conn.commit()
+
+    def rollup_counts(self):
+        return dict(((bucket, event_type, camera_id), count) for bucket, event_type, camera_id, count in
+                    self.conn.execute("SELECT bucket, event_type, camera_id, count FROM event_rollup"))
+
+    def test_backfill_and_trigger_count_each_event_once(self):
+        # Rows that predate the trigger...
+        self.insert('2024-05-01 10:05:00', 'INTRUDER')
+        self.insert('2024-05-01 10:45:00', 'INTRUDER')
+        self.insert('2024-05-01 11:00:00', 'SYSTEM')
+        rollups.ensure_rollup_schema(self.conn)
+        # ...and rows the trigger sees, including one in an already backfilled bucket
+        self.insert('2024-05-01 10:30:00', 'INTRUDER', 'cam0')
+        self.insert('2024-05-01 12:00:00', 'INTRUDER', 'cam0')
+
+        progress = list(rollups.backfill(self.conn, batch_size=2))
+
+        self.assertEqual(progress, [(2, 3), (3, 3)])
+        self.assertEqual(self.rollup_counts(), {
+            ('2024-05-01 10:00:00', 'INTRUDER', rollups.SYSTEM_CAMERA): 1,
+            ('2024-05-01 10:45:00', 'INTRUDER', rollups.SYSTEM_CAMERA): 1,
+            ('2024-05-01 10:30:00', 'INTRUDER', 'cam0'): 1,
+            ('2024-05-01 11:00:00', 'SYSTEM', rollups.SYSTEM_CAMERA): 1,
+            ('2024-05-01 12:00:00', 'INTRUDER', 'cam0'): 1,
+        })
+        total = self.conn.execute("SELECT SUM(count) FROM event_rollup").fetchone()[0]
+        self.assertEqual(total, self.conn.execute("SELECT COUNT(*) FROM events").fetchone()[0])
+
+    def test_backfill_resumes_and_schema_is_idempotent(self):
+        for minute in range(5):
+            self.insert(f'2024-05-01 10:0{minute}:00', 'INTRUDER')
+        rollups.ensure_rollup_schema(self.conn)
+
+        # Interrupted after the first batch
+        next(rollups.backfill(self.conn, batch_size=2))
+        rollups.ensure_rollup_schema(self.conn)
+        self.insert('2024-05-01 10:30:00', 'INTRUDER')
+        list(rollups.backfill(self.conn, batch_size=2))
+        # Nothing left to do on a second run
+        self.assertEqual(list(rollups.backfill(self.conn)), [])
+
+        self.assertEqual(self.rollup_counts(), {
+            ('2024-05-01 10:00:00', 'INTRUDER', rollups.SYSTEM_CAMERA): 5,
+            ('2024-05-01 10:30:00', 'INTRUDER', rollups.SYSTEM_CAMERA): 1,
+        })
+
+    def test_hourly_rollups_are_replaced_and_recounted(self):
+        self.insert('2024-05-01 10:05:00', 'INTRUDER')
+        self.conn.executescript('''
+            ALTER TABLE events ADD COLUMN camera_id TEXT;
+            CREATE TABLE event_rollup_hourly (bucket TEXT, event_type TEXT, camera_id TEXT, count INTEGER);
+            CREATE TRIGGER events_rollup_hourly AFTER INSERT ON events
+            BEGIN
+                INSERT INTO event_rollup_hourly VALUES ('x', NEW.event_type, 'x', 1);
+            END;
+            CREATE TABLE rollup_state (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            INSERT INTO rollup_state VALUES ('backfill_upto', 0), ('backfilled_id', 0);
+        ''')
+        self.insert('2024-05-01 10:20:00', 'INTRUDER')
+        rollups.ensure_rollup_schema(self.conn)
+        self.insert('2024-05-01 10:25:00', 'INTRUDER')
+        list(rollups.backfill(self.conn))
+
+        tables = {row[0] for row in self.conn.execute("SELECT name FROM sqlite_master")}
+        self.assertNotIn('event_rollup_hourly', tables)
+        self.assertNotIn('events_rollup_hourly', tables)
+        self.assertEqual(self.rollup_counts(), {
+            ('2024-05-01 10:00:00', 'INTRUDER', rollups.SYSTEM_CAMERA): 1,
+            ('2024-05-01 10:15:00', 'INTRUDER', rollups.SYSTEM_CAMERA): 2,
+        })
+
+    def test_series_use_local_hours_and_days(self):
+        rollups.ensure_rollup_schema(self.conn)
+        # 23:50, 00:10 and 00:40 in Asia/Kolkata (UTC+5:30)
+        for timestamp in ('2024-05-01 18:20:00', '2024-05-01 18:40:00', '2024-05-01 19:10:00'):
+            self.insert(timestamp, 'INTRUDER', 'cam0')
+        kolkata = zoneinfo.ZoneInfo('Asia/Kolkata')
+
+        def series(granularity):
+            return rollups.query_series(self.conn, '2024-05-01 00:00:00', '2024-05-03 00:00:00',
+                                        granularity, tz=kolkata)['INTRUDER']
+
+        self.assertEqual(series('hour'), [('2024-05-01 23:00:00', 1), ('2024-05-02 00:00:00', 2)])
+        self.assertEqual(series('day'), [('2024-05-01', 1), ('2024-05-02', 2)])
+        self.assertEqual(series('hour_of_day'), [('00', 2), ('23', 1)])
+        # The UTC window edges are honoured at quarter-hour resolution
+        self.assertEqual(
+            rollups.query_series(self.conn, '2024-05-01 18:30:00', '2024-05-01 19:00:00', 'hour', tz=kolkata),
+            {'INTRUDER': [('2024-05-02 00:00:00', 1)]},
+        )
+
+    def test_series_follow_dst_changes(self):
+        rollups.ensure_rollup_schema(self.conn)
+        # New York springs forward at 07:00 UTC on 2024-03-10: 01:30 EST, then 03:30 EDT
+        for timestamp in ('2024-03-10 06:30:00', '2024-03-10 07:30:00'):
+            self.insert(timestamp, 'INTRUDER', 'cam0')
+        series = rollups.query_series(self.conn, '2024-03-10 00:00:00', '2024-03-11 00:00:00', 'hour',
+                                      tz=zoneinfo.ZoneInfo('America/New_York'))
+        self.assertEqual(series, {'INTRUDER': [('2024-03-10 01:00:00', 1), ('2024-03-10 03:00:00', 1)]})
+
+
+class VisitorIndexTests(SimpleTestCase):
+    def test_same_face_keeps_its_visitor_id(self):
+        index = VisitorIndex(capacity=4, match_distance=0.5, dim=2)
+        first = index.assign([0.0, 0.0], now=1000)
+        self.assertEqual(index.assign([0.1, 0.0], now=1001), first)
+        self.assertNotEqual(index.assign([5.0, 0.0], now=1002), first)
+
+    def test_full_index_evicts_most_faded_cluster(self):
+        index = VisitorIndex(capacity=2, match_distance=0.5, half_life=100, dim=2)
+        regular = index.assign([0.0, 0.0], now=1000)
+        index.assign([0.0, 0.0], now=1001)
+        once = index.assign([5.0, 0.0], now=1002)
+        newcomer = index.assign([10.0, 0.0], now=1003)
+
+        ids = {cluster['visitor_id'] for cluster in index.clusters(now=1003)}
+        self.assertEqual(ids, {regular, newcomer})
+        # The evicted face comes back as a new visitor
+        self.assertNotIn(index.assign([5.0, 0.0], now=1004), (once, regular, newcomer))
+
+    def test_clusters_expire_after_ttl(self):
+        index = VisitorIndex(capacity=4, ttl=60, dim=2)
+        visitor = index.assign([0.0, 0.0], now=1000)
+        self.assertEqual(len(index.clusters(now=1060)), 1)
+        self.assertEqual(index.clusters(now=1061), [])
+        self.assertNotEqual(index.assign([0.0, 0.0], now=1061), visitor)
+
+    def test_alert_cooldown(self):
+        index = VisitorIndex(capacity=4, dim=2)
+        visitor = index.assign([0.0, 0.0], now=1000)
+        self.assertEqual(index.record_event(visitor, alert_cooldown=100, now=1000), (1, True))
+        self.assertEqual(index.record_event(visitor, alert_cooldown=100, now=1099), (2, False))
+        self.assertEqual(index.record_event(visitor, alert_cooldown=100, now=1100), (3, True))
+        self.assertEqual(index.record_event(visitor, alert_cooldown=0, now=1101), (4, True))
+        # Evicted/unknown visitors always alert
+        self.assertEqual(index.record_event(12345, alert_cooldown=100, now=1101), (1, True))
+
+
+def unit(axis, length=1.0):
+    vector = np.zeros(128)
+    vector[axis] = length
+    return vector
+
+
+@mock.patch.object(face_gallery, 'FACE_CENTROID_MARGIN', 0.08)
+@mock.patch.object(face_gallery, 'FACE_REFINE_TOP_K', 3)
+class FaceGalleryDecideTests(SimpleTestCase):
+    TOLERANCE = 0.45
+
+    def setUp(self):
+        self.gallery = face_gallery.FaceGallery(['alice', 'bob'], {
+            # Centroid at 0.44 * e1, both samples 0.53 away from the origin
+            'alice': [unit(1, 0.44) + unit(0, 0.3), unit(1, 0.44) - unit(0, 0.3)],
+            # Centroid at 0.46 * e2, but one sample right next to the origin
+            'bob': [unit(2, 0.1), unit(2, 0.82)],
+        })
+
+    def decide(self, encoding):
+        return self.gallery.match(encoding, self.TOLERANCE)
+
+    def test_clear_centroid_match_skips_samples(self):
+        self.assertEqual(self.decide(unit(1, 0.44)), 'alice')
+
+    def test_clear_miss_is_unknown(self):
+        self.assertEqual(self.decide(unit(3, 2.0)), 'Unknown')
+
+    def test_borderline_picks_identity_with_closest_sample(self):
+        # alice's centroid is closer, but only bob has a sample within tolerance
+        self.assertEqual(self.decide(np.zeros(128)), 'bob')
+
+    def test_borderline_without_close_sample_is_unknown(self):
+        gallery = face_gallery.FaceGallery(['alice'], {'alice': [unit(0, 0.6), unit(0, -0.6)]})
+        # 0.45 from the centroid (borderline), 0.75 from either sample
+        self.assertEqual(gallery.match(unit(1, 0.45), self.TOLERANCE), 'Unknown')
+        # 0.45 from the centroid, 0.15 from a sample
+        self.assertEqual(gallery.match(unit(0, 0.45), self.TOLERANCE), 'alice')
+
+
+class FindFrameTests(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        os.makedirs(recorder.camera_dir('cam0', self.root))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write_segment(self, start, timestamps):
+        """Writes a segment whose frames are the bytes of their own timestamp."""
+        base_path = os.path.join(recorder.camera_dir('cam0', self.root), f"{int(start * 1000):013d}")
+        index = np.zeros(len(timestamps), dtype=recorder.INDEX_DTYPE)
+        offset = 0
+        with open(base_path + '.mjpg', 'wb') as f:
+            for i, ts in enumerate(timestamps):
+                data = f"{ts:.1f}".encode()
+                f.write(data)
+                index[i] = (ts, offset, len(data))
+                offset += len(data)
+        index.tofile(base_path + '.idx')
+
+    def find(self, ts):
+        return recorder.find_frame('cam0', ts, self.root)
+
+    def test_frames_within_a_segment(self):
+        self.write_segment(1000, [1000.0, 1001.0, 1002.0])
+        self.assertEqual(self.find(1001.0), (1001.0, b'1001.0'))
+        self.assertEqual(self.find(1001.9), (1001.0, b'1001.0'))
+        self.assertEqual(self.find(1004.0), (1002.0, b'1002.0'))
+
+    def test_before_first_recording(self):
+        self.write_segment(1000, [1000.0, 1001.0])
+        self.assertIsNone(self.find(999.0))
+        self.assertIsNone(recorder.find_frame('missing', 1000.0, self.root))
+
+    def test_gap_longer_than_max_seek_is_empty(self):
+        self.write_segment(1000, [1000.0, 1001.0])
+        self.write_segment(1100, [1100.0])
+        self.assertEqual(self.find(1001.0 + recorder.MAX_SEEK_GAP_SECONDS), (1001.0, b'1001.0'))
+        self.assertIsNone(self.find(1050.0))
+        self.assertIsNone(self.find(1099.9))
+        self.assertEqual(self.find(1100.0), (1100.0, b'1100.0'))
+
+    def test_segment_boundary_uses_previous_tail(self):
+        # The next segment is named after its first tick but its first frame lands later
+        self.write_segment(1000, [1058.0, 1059.0])
+        self.write_segment(1060, [1060.5, 1061.0])
+        self.assertEqual(self.find(1060.2), (1059.0, b'1059.0'))
+        self.assertEqual(self.find(1060.5), (1060.5, b'1060.5'))
+
+    def test_empty_index_falls_back_to_previous_segment(self):
+        self.write_segment(1000, [1000.0, 1001.0])
+        self.write_segment(1002, [])  # Opened, nothing written yet
+        self.assertEqual(self.find(1003.0), (1001.0, b'1001.0'))
+
+
+class FaceManifestPagingTests(SimpleTestCase):
+    def setUp(self):
+        self.faces_dir = tempfile.mkdtemp()
+        for name, count in (('alice', 3), ('bob', 2)):
+            os.makedirs(os.path.join(self.faces_dir, name))
+            for i in range(count):
+                open(os.path.join(self.faces_dir, name, f'{i}.jpg'), 'wb').close()
+        open(os.path.join(self.faces_dir, 'carol.png'), 'wb').close()
+        self.conn = sqlite3.connect(':memory:')
+        face_manifest.ensure_manifest(self.conn, self.faces_dir)
+
+    def tearDown(self):
+        self.conn.close()
+        shutil.rmtree(self.faces_dir)
+
+    def pages(self, limit):
+        pages, after = [], None
+        while True:
+            entries, after = face_manifest.list_entries(self.conn, after, limit)
+            pages.append([entry['file'] for entry in entries])
+            if after is None:
+                return pages
+
+    def test_pages_cover_every_file_once_in_order(self):
+        self.assertEqual(self.pages(2), [
+            ['alice/0.jpg', 'alice/1.jpg'],
+            ['alice/2.jpg', 'bob/0.jpg'],
+            ['bob/1.jpg', 'carol.png'],
+        ])
+
+    def test_exact_last_page_has_no_cursor(self):
+        self.assertEqual(self.pages(3), [['alice/0.jpg', 'alice/1.jpg', 'alice/2.jpg'],
+                                         ['bob/0.jpg', 'bob/1.jpg', 'carol.png']])
+        entries, after = face_manifest.list_entries(self.conn, limit=6)
+        self.assertEqual((len(entries), after), (6, None))
+
+    def test_cursor_survives_changes_between_pages(self):
+        entries, after = face_manifest.list_entries(self.conn, limit=2)
+        self.assertEqual(after, 'alice/1.jpg')
+        # A file added before the cursor must not shift the next page
+        self.conn.execute("INSERT INTO known_faces VALUES ('aaron/0.jpg', 'aaron', NULL, 'pending', 0)")
+        entries, after = face_manifest.list_entries(self.conn, after, 2)
+        self.assertEqual([entry['file'] for entry in entries], ['alice/2.jpg', 'bob/0.jpg'])
+
+    def test_manifest_fill_writes_no_thumbnails(self):
+        entry = face_manifest.get_entry(self.conn, 'carol.png')
+        self.assertEqual(entry['name'], 'carol')
+        self.assertEqual(entry['encoding_status'], face_manifest.STATUS_PENDING)
+        self.assertFalse(os.path.exists(entry['thumb_path']))
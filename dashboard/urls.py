@@ -11,10 +11,27 @@ urlpatterns = [
     # Path for setting the status
     path('set_status/<str:new_status>/', views.set_status, name='set_status'),
     
-    # Path for deleting a face
-    path('delete_face/<str:filename>/', views.delete_face, name='delete_face'),
+    # Path for deleting a face image (may be <name>/<file>)
+    path('delete_face/<path:filename>/', views.delete_face, name='delete_face'),
+    
+    # Enrolled faces: paginated manifest listing and thumbnails
+    path('faces/', views.list_faces, name='list_faces'),
+    path('faces/thumb/<path:filename>', views.face_thumbnail, name='face_thumbnail'),
     
     # --- NEW PATH ---
     # Path for fetching the latest events
     path('get_latest_events/', views.get_latest_events, name='get_latest_events'),
+    
+    # Recurring unknown visitors (clustered face encodings)
+    path('visitors/', views.list_visitors, name='list_visitors'),
+    
+    # Event counts over time for charts (from the quarter-hour rollups)
+    path('analytics/events/', views.event_analytics, name='event_analytics'),
+    
+    # Continuous recording: JPEG frame at ?t=<time>
+    path('recordings/frame/', views.recording_frame, name='recording_frame'),
+    
+    # Intruder captures: thumbnails for the dashboard, originals on click
+    path('intruders/thumb/<path:key>', views.intruder_thumbnail, name='intruder_thumbnail'),
+    path('intruders/image/<path:key>', views.intruder_image, name='intruder_image'),
 ]
\ No newline at end of file
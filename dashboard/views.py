@@ -1,9 +1,24 @@
 from django.shortcuts import render, redirect
-from django.http import StreamingHttpResponse, JsonResponse
-from .camera import VideoCamera
+from django.http import StreamingHttpResponse, JsonResponse, FileResponse, HttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.utils.dateparse import parse_datetime, parse_time
 import sqlite3
 from django.utils import timezone
 import os
+import uuid
+import datetime
+import math
+from . import media_store
+from . import face_manifest
+
+# Captures never change once written, thumbnails can be cached for a week
+THUMBNAIL_MAX_AGE = 7 * 24 * 3600
+INTRUDER_IMAGE_MAX_AGE = 24 * 3600
+# Longest /analytics/events/ window: one (leap) year
+ANALYTICS_MAX_HOURS = 366 * 24
+FACES_PAGE_SIZE = int(os.getenv('FACES_PAGE_SIZE', 50))
 
 # --- Database Helper Functions (No changes) ---
 def get_db():
@@ -39,15 +54,48 @@ def log_event_from_web(event_type, details=None):
     except Exception as e:
         print(f"Error logging web event: {e}")
 
+def add_image_urls(events):
+    """Adds thumb_url/image_url to events that have a capture attached."""
+    for event in events:
+        if event.get('image_path'):
+            key = media_store.media_key(event['image_path'])
+            event['thumb_url'] = reverse('intruder_thumbnail', args=[key])
+            event['image_url'] = reverse('intruder_image', args=[key])
+    return events
+
+def face_entry_json(entry):
+    """A manifest row as sent to the page (thumbnail URL instead of a disk path)."""
+    return {
+        'file': entry['file'],
+        'name': entry['name'],
+        'encoding_status': entry['encoding_status'],
+        'thumb_url': reverse('face_thumbnail', args=[entry['file']]),
+    }
+
+def cached_file_response(request, filepath, max_age, content_type='image/jpeg'):
+    """
+    Serves a file with ETag/Last-Modified/Cache-Control headers and answers
+    conditional requests with 304 without opening the file.
+    """
+    stat = os.stat(filepath)
+    etag = f'"{int(stat.st_mtime)}-{stat.st_size}"'
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        response = FileResponse(open(filepath, 'rb'), content_type=content_type)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = f'public, max-age={max_age}'
+    return response
+
 # --- File Upload Helper (MODIFIED) ---
 def handle_uploaded_file(uploaded_file, person_name):
     """
-    Saves the uploaded file and returns the saved filename.
-    Raises an error if something goes wrong.
+    Saves the uploaded file as another reference image of the person
+    (known_faces/<name>/<timestamp>.<ext>), records it in the manifest and
+    returns the manifest entry. Raises an error if something goes wrong.
     """
+    from . import face_gallery  # imports numpy, keep it off the startup path
     FACES_DIR = 'known_faces'
-    if not os.path.exists(FACES_DIR):
-        os.makedirs(FACES_DIR)
     
     # Sanitize the name to prevent path issues
     safe_name = "".join(c for c in person_name if c.isalnum() or c in (' ', '_')).rstrip()
@@ -58,15 +106,23 @@ def handle_uploaded_file(uploaded_file, person_name):
     if extension not in ['.jpg', '.jpeg', '.png']:
         raise ValueError("Invalid file type. Only .jpg, .jpeg, .png are allowed.")
 
-    filename = f"{safe_name}{extension}"
-    filepath = os.path.join(FACES_DIR, filename)
+    person_dir = os.path.join(FACES_DIR, safe_name)
+    os.makedirs(person_dir, exist_ok=True)
+    # Unique per upload, so a new photo adds to the gallery instead of replacing it
+    filename = f"{timezone.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}{extension}"
+    filepath = os.path.join(person_dir, filename)
     
     try:
         with open(filepath, 'wb+') as destination:
             for chunk in uploaded_file.chunks():
                 destination.write(chunk)
-        print(f"Saved new face: {filename}")
-        return filename  # Return the actual filename saved
+        print(f"Saved new face: {filepath}")
+        face_gallery.mark_changed()
+        conn = get_db()
+        face_manifest.add_entry(conn, safe_name, filepath, FACES_DIR)
+        entry = face_manifest.get_entry(conn, f"{safe_name}/{filename}")
+        conn.close()
+        return entry  # The new manifest row (file is the path within known_faces)
     except Exception as e:
         print(f"Error saving file: {e}")
         raise e # Re-raise the exception to be caught by the view
@@ -87,10 +143,10 @@ def index(request):
             
             if person_name and uploaded_file:
                 try:
-                    filename = handle_uploaded_file(uploaded_file, person_name)
-                    log_event_from_web("FACE_ADDED", f"Authorized person '{filename}' was added.")
+                    entry = handle_uploaded_file(uploaded_file, person_name)
+                    log_event_from_web("FACE_ADDED", f"Authorized person '{entry['file']}' was added.")
                     # Send back a success response
-                    return JsonResponse({'status': 'SUCCESS', 'filename': filename})
+                    return JsonResponse({'status': 'SUCCESS', 'filename': entry['file'], 'face': face_entry_json(entry)})
                 except Exception as e:
                     return JsonResponse({'status': 'ERROR', 'message': str(e)}, status=400)
             else:
@@ -104,23 +160,31 @@ def index(request):
     current_status = get_current_status()
     events = []
     known_faces_list = []
+    faces_next = None
     try:
         conn = get_db()
         c_events = conn.cursor()
         c_events.execute("SELECT * FROM events ORDER BY timestamp DESC LIMIT 20")
-        events = [dict(row) for row in c_events.fetchall()] # Convert to dicts
+        events = add_image_urls([dict(row) for row in c_events.fetchall()]) # Convert to dicts
         conn.close()
     except Exception as e:
         print(f"Error fetching events: {e}")
 
-    FACES_DIR = 'known_faces'
-    if os.path.exists(FACES_DIR):
-        known_faces_list = [f for f in os.listdir(FACES_DIR) if f.lower().endswith(('.jpg', '.png', '.jpeg'))]
+    # First page of the enrollment manifest; the rest is loaded via list_faces
+    try:
+        conn = get_db()
+        face_manifest.ensure_manifest(conn)
+        entries, faces_next = face_manifest.list_entries(conn, limit=FACES_PAGE_SIZE)
+        known_faces_list = [face_entry_json(entry) for entry in entries]
+        conn.close()
+    except Exception as e:
+        print(f"Error fetching known faces: {e}")
 
     context = {
         'current_status': current_status,
         'events': events, # Pass initial events
         'known_faces_list': known_faces_list,
+        'faces_next': faces_next,
     }
     return render(request, 'dashboard/index.html', context)
 
@@ -136,7 +200,7 @@ def get_latest_events(request):
         c = conn.cursor()
         c.execute("SELECT * FROM events ORDER BY timestamp DESC LIMIT 20")
         # Convert sqlite3.Row objects to plain dictionaries
-        events = [dict(row) for row in c.fetchall()]
+        events = add_image_urls([dict(row) for row in c.fetchall()])
         conn.close()
     except Exception as e:
         print(f"Error fetching events for JSON: {e}")
@@ -149,7 +213,9 @@ def get_latest_events(request):
 
 def video_feed(request):
     try:
-        camera = VideoCamera()
+        # Imported here so OpenCV/dlib only load on first camera use
+        from . import camera as camera_module
+        camera = camera_module.get_camera()
         return StreamingHttpResponse(
             camera.stream_frames(),
             content_type='multipart/x-mixed-replace; boundary=frame'
@@ -175,13 +241,25 @@ def set_status(request, new_status):
     return JsonResponse({'status': 'ERROR', 'message': 'Invalid status'}, status=400)
 
 def delete_face(request, filename):
+    from . import face_gallery
     FACES_DIR = 'known_faces'
-    filepath = os.path.join(FACES_DIR, filename)
-    if not os.path.normpath(filepath).startswith(os.path.normpath(FACES_DIR)):
+    filepath = os.path.normpath(os.path.join(FACES_DIR, filename))
+    if not filepath.startswith(os.path.normpath(FACES_DIR) + os.sep):
+        return JsonResponse({'status': 'ERROR', 'message': 'Invalid filename'}, status=400)
+    # Hidden entries (e.g. .thumbs) aren't gallery images, however the path reaches them
+    if any(part.startswith('.') for part in os.path.relpath(filepath, FACES_DIR).split(os.sep)):
         return JsonResponse({'status': 'ERROR', 'message': 'Invalid filename'}, status=400)
     try:
-        if os.path.exists(filepath):
+        if os.path.isfile(filepath):
             os.remove(filepath)
+            # Drop the person's directory once their last image is gone
+            person_dir = os.path.dirname(filepath)
+            if person_dir != os.path.normpath(FACES_DIR) and not os.listdir(person_dir):
+                os.rmdir(person_dir)
+            face_gallery.mark_changed()
+            conn = get_db()
+            face_manifest.remove_entry(conn, os.path.relpath(filepath, FACES_DIR).replace(os.sep, '/'))
+            conn.close()
             print(f"Deleted face: {filename}")
             log_event_from_web("FACE_DELETED", f"Authorized person '{filename}' was removed.")
             return JsonResponse({'status': 'SUCCESS', 'filename': filename})
@@ -189,4 +267,182 @@ def delete_face(request, filename):
             return JsonResponse({'status': 'ERROR', 'message': 'File not found'}, status=404)
     except Exception as e:
         print(f"Error deleting face {filename}: {e}")
-        return JsonResponse({'status': 'ERROR', 'message': str(e)}, status=500)
\ No newline at end of file
+        return JsonResponse({'status': 'ERROR', 'message': str(e)}, status=500)
+
+def list_faces(request):
+    """
+    One page of enrolled faces from the manifest: ?after=<cursor>&limit=<n>.
+    `next` is the cursor for the following page (null on the last one).
+    """
+    try:
+        limit = min(max(1, int(request.GET.get('limit', FACES_PAGE_SIZE))), 500)
+    except ValueError:
+        return JsonResponse({'status': 'ERROR', 'message': 'Invalid limit'}, status=400)
+    try:
+        conn = get_db()
+        face_manifest.ensure_manifest(conn)
+        entries, next_cursor = face_manifest.list_entries(conn, request.GET.get('after'), limit)
+        conn.close()
+    except Exception as e:
+        print(f"Error listing faces: {e}")
+        return JsonResponse({'status': 'ERROR', 'message': str(e)}, status=500)
+    return JsonResponse({
+        'status': 'SUCCESS',
+        'faces': [face_entry_json(entry) for entry in entries],
+        'next': next_cursor,
+    })
+
+def face_thumbnail(request, filename):
+    """
+    Serves an enrolled face's thumbnail with ETag/Last-Modified caching,
+    writing it first if it is missing or older than the image.
+    """
+    try:
+        conn = get_db()
+        entry = face_manifest.get_entry(conn, filename)
+        conn.close()
+    except Exception as e:
+        print(f"Error reading face manifest: {e}")
+        return JsonResponse({'status': 'ERROR', 'message': str(e)}, status=500)
+    thumb_path = face_manifest.ensure_thumbnail(entry['file']) if entry else None
+    if thumb_path is None:
+        return JsonResponse({'status': 'ERROR', 'message': 'File not found'}, status=404)
+    return cached_file_response(request, thumb_path, THUMBNAIL_MAX_AGE)
+
+def list_visitors(request):
+    """
+    Recurring unknown visitors with their sighting/event counts, answered
+    from the in-memory cluster index (empty until the camera has run).
+    """
+    from .visitors import visitor_index
+    return JsonResponse({'status': 'SUCCESS', 'visitors': visitor_index.clusters()})
+
+def event_analytics(request):
+    """
+    Time series of event counts for charts, answered from the rollups.
+    ?hours=<window, 1..8784, default 168> &granularity=hour|day|hour_of_day
+    &event_type=<type> &camera=<id>. Hours and days are those of the
+    dashboard's TIME_ZONE, like the times /recordings/frame/ accepts.
+    """
+    from . import rollups
+    granularity = request.GET.get('granularity', 'hour')
+    if granularity not in rollups.GRANULARITIES:
+        return JsonResponse({'status': 'ERROR', 'message': 'Invalid granularity'}, status=400)
+    try:
+        hours = int(request.GET.get('hours', 168))
+    except ValueError:
+        return JsonResponse({'status': 'ERROR', 'message': 'Invalid hours'}, status=400)
+    if not 1 <= hours <= ANALYTICS_MAX_HOURS:
+        return JsonResponse(
+            {'status': 'ERROR', 'message': f'hours must be between 1 and {ANALYTICS_MAX_HOURS}'}, status=400)
+
+    # Window edges on local hour boundaries, queried in UTC like events.timestamp
+    tz = timezone.get_current_timezone()
+    now = timezone.localtime()
+    since = (now - datetime.timedelta(hours=hours)).replace(minute=0, second=0, microsecond=0)
+    until = now.replace(minute=0, second=0, microsecond=0) + datetime.timedelta(hours=1)
+    series = {}
+    try:
+        conn = get_db()
+        table = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (rollups.ROLLUP_TABLE,)
+        ).fetchone()
+        if table:
+            series = rollups.query_series(
+                conn,
+                since.astimezone(datetime.timezone.utc).strftime(rollups.BUCKET_FORMAT),
+                until.astimezone(datetime.timezone.utc).strftime(rollups.BUCKET_FORMAT),
+                granularity,
+                event_type=request.GET.get('event_type'),
+                camera_id=request.GET.get('camera'),
+                tz=tz,
+            )
+        conn.close()
+    except Exception as e:
+        print(f"Error fetching analytics: {e}")
+        return JsonResponse({'status': 'ERROR', 'message': str(e)}, status=500)
+
+    return JsonResponse({
+        'status': 'SUCCESS',
+        'granularity': granularity,
+        'since': since.strftime(rollups.BUCKET_FORMAT),
+        'until': until.strftime(rollups.BUCKET_FORMAT),
+        'timezone': str(tz),
+        'series': {
+            event_type: [{'bucket': bucket, 'count': count} for bucket, count in points]
+            for event_type, points in series.items()
+        },
+    })
+
+def parse_recording_time(value):
+    """
+    Accepts epoch seconds, 'YYYY-MM-DD HH:MM:SS' or just 'HH:MM:SS' (today),
+    both in the dashboard's time zone. Returns epoch seconds or None.
+    """
+    try:
+        ts = float(value)
+        # float() also accepts 'nan' and 'inf'
+        return ts if math.isfinite(ts) else None
+    except (TypeError, ValueError):
+        pass
+    value = (value or '').strip()
+    try:
+        # Well-formed but out-of-range values ('25:00:00') raise ValueError
+        parsed = parse_datetime(value)
+        if parsed is None:
+            time_of_day = parse_time(value)
+            if time_of_day is None:
+                return None
+            parsed = datetime.datetime.combine(timezone.localdate(), time_of_day)
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed.timestamp()
+    except (ValueError, OverflowError):
+        return None
+
+def recording_frame(request):
+    """
+    Returns the recorded JPEG frame for ?t=<time> (&camera=<id>), seeking
+    through the segment index instead of scanning video files.
+    """
+    from . import recorder
+    ts = parse_recording_time(request.GET.get('t'))
+    if ts is None:
+        return JsonResponse({'status': 'ERROR', 'message': 'Invalid or missing time'}, status=400)
+    camera_id = request.GET.get('camera', os.getenv('CAMERA_ID', 'cam0'))
+    if not camera_id.replace('_', '').replace('-', '').isalnum():
+        return JsonResponse({'status': 'ERROR', 'message': 'Invalid camera'}, status=400)
+    try:
+        found = recorder.find_frame(camera_id, ts)
+    except Exception as e:
+        print(f"Error reading recording: {e}")
+        return JsonResponse({'status': 'ERROR', 'message': str(e)}, status=500)
+    if found is None:
+        return JsonResponse({'status': 'ERROR', 'message': 'Nothing recorded at that time'}, status=404)
+    frame_ts, jpeg_bytes = found
+    response = HttpResponse(jpeg_bytes, content_type='image/jpeg')
+    response['X-Frame-Timestamp'] = f"{frame_ts:.3f}"
+    # Recorded frames never change
+    response['Cache-Control'] = f'public, max-age={INTRUDER_IMAGE_MAX_AGE}'
+    return response
+
+def intruder_thumbnail(request, key):
+    """Serves the thumbnail of a capture (falls back to the file itself for older captures)."""
+    filepath = media_store.resolve_media_key(key)
+    if filepath is None:
+        return JsonResponse({'status': 'ERROR', 'message': 'Invalid path'}, status=400)
+    thumb_path = media_store.thumbnail_path_for(filepath)
+    if os.path.exists(thumb_path):
+        filepath = thumb_path
+    if not os.path.exists(filepath):
+        return JsonResponse({'status': 'ERROR', 'message': 'File not found'}, status=404)
+    return cached_file_response(request, filepath, THUMBNAIL_MAX_AGE)
+
+def intruder_image(request, key):
+    """Serves a full-size capture (or whatever the retention job left in its place)."""
+    filepath = media_store.resolve_media_key(key)
+    if filepath is None:
+        return JsonResponse({'status': 'ERROR', 'message': 'Invalid path'}, status=400)
+    if not os.path.exists(filepath):
+        return JsonResponse({'status': 'ERROR', 'message': 'File not found'}, status=404)
+    return cached_file_response(request, filepath, INTRUDER_IMAGE_MAX_AGE)
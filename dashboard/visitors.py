@@ -0,0 +1,147 @@
+"""
+In-memory clustering of unknown faces into recurring "visitors".
+
+Every unknown face encoding is assigned to its nearest recent cluster (or
+starts a new one), so the same delivery driver turning up again gets the
+same visitor id. The index is bounded: clusters expire after
+VISITOR_TTL_SECONDS without a sighting and, when full, the cluster with the
+lowest time-decayed sighting weight is evicted.
+"""
+import os
+import threading
+import time
+
+import numpy as np
+
+VISITOR_MATCH_DISTANCE = float(os.getenv('VISITOR_MATCH_DISTANCE', 0.5))
+VISITOR_INDEX_SIZE = int(os.getenv('VISITOR_INDEX_SIZE', 256))
+VISITOR_TTL_SECONDS = int(os.getenv('VISITOR_TTL_SECONDS', 24 * 3600))
+VISITOR_HALF_LIFE_SECONDS = int(os.getenv('VISITOR_HALF_LIFE_SECONDS', 6 * 3600))
+VISITOR_ALERT_COOLDOWN = int(os.getenv('VISITOR_ALERT_COOLDOWN', 3600))
+
+# Centroids follow a running mean, but never slower than this, so a
+# cluster keeps adapting to e.g. changing light over the day.
+MAX_CENTROID_SAMPLES = 20
+
+
+class VisitorIndex:
+    def __init__(self, capacity=VISITOR_INDEX_SIZE, match_distance=VISITOR_MATCH_DISTANCE,
+                 ttl=VISITOR_TTL_SECONDS, half_life=VISITOR_HALF_LIFE_SECONDS, dim=128):
+        self.capacity = capacity
+        self.match_distance = match_distance
+        self.ttl = ttl
+        self.half_life = half_life
+
+        # One slot per cluster; centroids live in a single array so the
+        # nearest-neighbour search is one vectorised distance computation.
+        self._centroids = np.zeros((capacity, dim), dtype=np.float64)
+        self._active = np.zeros(capacity, dtype=bool)
+        self._last_seen = np.zeros(capacity, dtype=np.float64)
+        self._weight = np.zeros(capacity, dtype=np.float64)
+        self._slot_ids = [None] * capacity
+        self._visitors = {}  # visitor_id -> stats dict (includes its slot)
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def seed_next_id(self, last_used_id):
+        """Continue numbering after ids already stored in the events table."""
+        with self._lock:
+            self._next_id = max(self._next_id, (last_used_id or 0) + 1)
+
+    def _decayed_weights(self, now):
+        return self._weight * np.power(0.5, (now - self._last_seen) / self.half_life)
+
+    def _expire(self, now):
+        expired = np.flatnonzero(self._active & ((now - self._last_seen) > self.ttl))
+        for slot in expired:
+            self._free_slot(slot)
+
+    def _free_slot(self, slot):
+        self._active[slot] = False
+        visitor_id = self._slot_ids[slot]
+        self._slot_ids[slot] = None
+        self._visitors.pop(visitor_id, None)
+
+    def assign(self, encoding, now=None):
+        """Returns the visitor id for an unknown face encoding."""
+        now = now or time.time()
+        encoding = np.asarray(encoding, dtype=np.float64)
+        with self._lock:
+            self._expire(now)
+
+            if self._active.any():
+                distances = np.linalg.norm(self._centroids - encoding, axis=1)
+                distances[~self._active] = np.inf
+                slot = int(np.argmin(distances))
+                if distances[slot] <= self.match_distance:
+                    visitor = self._visitors[self._slot_ids[slot]]
+                    visitor['sightings'] += 1
+                    visitor['last_seen'] = now
+                    rate = 1.0 / min(visitor['sightings'], MAX_CENTROID_SAMPLES)
+                    self._centroids[slot] += (encoding - self._centroids[slot]) * rate
+                    self._weight[slot] = self._decayed_weights(now)[slot] + 1.0
+                    self._last_seen[slot] = now
+                    return visitor['visitor_id']
+
+            # New visitor: take a free slot, or evict the most faded cluster
+            free = np.flatnonzero(~self._active)
+            if len(free):
+                slot = int(free[0])
+            else:
+                slot = int(np.argmin(self._decayed_weights(now)))
+                self._free_slot(slot)
+
+            visitor_id = self._next_id
+            self._next_id += 1
+            self._centroids[slot] = encoding
+            self._active[slot] = True
+            self._last_seen[slot] = now
+            self._weight[slot] = 1.0
+            self._slot_ids[slot] = visitor_id
+            self._visitors[visitor_id] = {
+                'visitor_id': visitor_id,
+                'slot': slot,
+                'first_seen': now,
+                'last_seen': now,
+                'sightings': 1,
+                'events': 0,
+                'last_alert': None,
+            }
+            return visitor_id
+
+    def record_event(self, visitor_id, alert_cooldown=VISITOR_ALERT_COOLDOWN, now=None):
+        """
+        Counts a confirmed intrusion for the visitor and returns
+        (event_count, should_alert). Alerts for the same visitor are
+        suppressed for alert_cooldown seconds (0 = never suppress).
+        """
+        now = now or time.time()
+        with self._lock:
+            visitor = self._visitors.get(visitor_id)
+            if visitor is None:
+                # Unknown or already evicted: treat it as a first sighting
+                return 1, True
+            visitor['events'] += 1
+            last_alert = visitor['last_alert']
+            should_alert = last_alert is None or not alert_cooldown or (now - last_alert) >= alert_cooldown
+            if should_alert:
+                visitor['last_alert'] = now
+            return visitor['events'], should_alert
+
+    def clusters(self, now=None):
+        """Snapshot of the live clusters, most recently seen first."""
+        now = now or time.time()
+        with self._lock:
+            self._expire(now)
+            weights = self._decayed_weights(now)
+            result = []
+            for visitor in self._visitors.values():
+                entry = {key: value for key, value in visitor.items() if key != 'slot'}
+                entry['weight'] = round(float(weights[visitor['slot']]), 3)
+                result.append(entry)
+        result.sort(key=lambda entry: entry['last_seen'], reverse=True)
+        return result
+
+
+# Shared by every camera in the process and by the /visitors/ API
+visitor_index = VisitorIndex()
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'security_project.settings')
 
 application = get_wsgi_application()
+
+# Load OpenCV, the face models and the Twilio client before the first request
+if os.getenv('CAMERA_WARMUP', 'False') == 'True':
+    from dashboard.camera import warm_up
+    warm_up()